@@ -0,0 +1,255 @@
+"""Offline admin tools for the Mines Game user store.
+
+Run with the bot stopped, since both processes write the same storage file:
+
+    python admin_cli.py export --format csv --output users.csv
+    python admin_cli.py import --input users.jsonl --chunk-size 500
+    python admin_cli.py archive rtp --hours 24
+    python admin_cli.py bulk add 50 --max-balance 100 --inactive-days 30 --dry-run
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+import bulk_ops
+from database import UserDatabase
+from game_archive import GameArchive, format_report
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ["user_id", "username", "first_name", "balance",
+                 "last_daily", "last_weekly", "selected_emoji", "emojis"]
+
+
+def iter_export_rows(db: UserDatabase) -> Iterator[Dict[str, Any]]:
+    """Yield one flat export row per user."""
+    for user_id, record in db.iter_users():
+        yield {
+            "user_id": user_id,
+            "username": record.get("username", ""),
+            "first_name": record.get("first_name", ""),
+            "balance": record.get("balance", 0),
+            "last_daily": record.get("last_daily"),
+            "last_weekly": record.get("last_weekly"),
+            "selected_emoji": record.get("selected_emoji", ""),
+            "emojis": record.get("emojis", []),
+        }
+
+
+def write_csv(rows: Iterable[Dict[str, Any]], out: TextIO) -> int:
+    """Stream rows to CSV; emojis are joined with spaces."""
+    writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        row = dict(row)
+        row["emojis"] = " ".join(row["emojis"])
+        writer.writerow({k: ("" if v is None else v) for k, v in row.items()})
+        count += 1
+    return count
+
+
+def write_jsonl(rows: Iterable[Dict[str, Any]], out: TextIO) -> int:
+    """Stream rows to JSON Lines."""
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def read_rows(source: TextIO, fmt: str) -> Iterator[Optional[Dict[str, Any]]]:
+    """Yield update rows from a CSV or JSONL stream without loading it whole.
+
+    Malformed JSONL lines are logged and yielded as None, so they count as skipped.
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(source):
+            if isinstance(row.get("emojis"), str):
+                row["emojis"] = row["emojis"].split()
+            yield row
+    else:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping malformed line: {e}")
+                yield None
+
+
+def _apply_row(db: UserDatabase, row: Optional[Dict[str, Any]]) -> bool:
+    """Apply balance/emoji fields of one row to an existing user.
+
+    The whole row is validated first; an invalid row changes nothing.
+    """
+    if not isinstance(row, dict):
+        return False
+    try:
+        user_id = int(row["user_id"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    if not db.user_exists(user_id):
+        return False
+
+    balance = None
+    if row.get("balance") not in (None, ""):
+        try:
+            balance = float(row["balance"])
+        except (TypeError, ValueError):
+            return False
+        if not math.isfinite(balance) or balance < 0:
+            return False
+    emojis = row.get("emojis") or []
+    if not isinstance(emojis, list) or not all(isinstance(emoji, str) for emoji in emojis):
+        return False
+    selected = row.get("selected_emoji")
+    if selected and not isinstance(selected, str):
+        return False
+
+    if balance is not None:
+        db.set_balance(user_id, balance, reason="import")
+    for emoji in emojis:
+        db.add_emoji(user_id, emoji)
+    if selected:
+        db.set_selected_emoji(user_id, selected)
+    return True
+
+
+def import_rows(
+    db: UserDatabase,
+    rows: Iterable[Dict[str, Any]],
+    chunk_size: int = 500,
+    progress: Optional[TextIO] = None
+) -> Dict[str, float]:
+    """Apply rows in chunks, committing storage once per chunk."""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    applied = skipped = 0
+    started = time.perf_counter()
+    rows = iter(rows)
+
+    while True:
+        chunk_applied = 0
+        with db.batch():
+            for row in rows:
+                if _apply_row(db, row):
+                    applied += 1
+                else:
+                    skipped += 1
+                chunk_applied += 1
+                if chunk_applied >= chunk_size:
+                    break
+        if progress is not None and chunk_applied:
+            elapsed = time.perf_counter() - started
+            rate = (applied + skipped) / elapsed if elapsed else 0.0
+            progress.write(f"{applied} applied, {skipped} skipped ({rate:.0f} rows/s)\n")
+        if chunk_applied < chunk_size:
+            break
+
+    elapsed = time.perf_counter() - started
+    return {
+        "applied": applied,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "rows_per_second": (applied + skipped) / elapsed if elapsed else 0.0,
+    }
+
+
+def cmd_export(db: UserDatabase, args: argparse.Namespace) -> None:
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        writer = write_csv if args.format == "csv" else write_jsonl
+        count = writer(iter_export_rows(db), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else 0.0
+    sys.stderr.write(f"Exported {count} users in {elapsed:.2f}s ({rate:.0f} rows/s)\n")
+
+
+def cmd_import(db: UserDatabase, args: argparse.Namespace) -> None:
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    with open(args.input, "r", newline="", encoding="utf-8") as source:
+        report = import_rows(db, read_rows(source, fmt), args.chunk_size, progress=sys.stderr)
+    sys.stderr.write(
+        f"Imported {report['applied']} users ({report['skipped']} skipped) "
+        f"in {report['seconds']:.2f}s ({report['rows_per_second']:.0f} rows/s)\n"
+    )
+
+
+def cmd_archive(db: UserDatabase, args: argparse.Namespace) -> None:
+    print(format_report(GameArchive(), args.kind, args.hours))
+
+
+def cmd_bulk(db: UserDatabase, args: argparse.Namespace) -> None:
+    selector = bulk_ops.Selector(args.min_balance, args.max_balance, args.inactive_days, args.emoji)
+    operation = bulk_ops.Operation(args.operation, args.value)
+    summary = bulk_ops.run(db, selector, operation, args.chunk_size, args.dry_run, actor="cli")
+    print(bulk_ops.format_summary(selector, operation, summary))
+
+
+def positive_int(value: str) -> int:
+    """argparse type for sizes that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {number}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mines Game admin tools")
+    parser.add_argument("--db", default="users.json", help="Storage file name inside DATA_DIR")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Stream users out to CSV or JSONL")
+    export.add_argument("--format", choices=["csv", "jsonl"], default="jsonl")
+    export.add_argument("--output", help="Output file (default: stdout)")
+    export.set_defaults(func=cmd_export)
+
+    imp = sub.add_parser("import", help="Apply balance/emoji updates from CSV or JSONL")
+    imp.add_argument("--input", required=True)
+    imp.add_argument("--format", choices=["csv", "jsonl"])
+    imp.add_argument("--chunk-size", type=positive_int, default=500)
+    imp.set_defaults(func=cmd_import)
+
+    archive = sub.add_parser("archive", help="Query the finished-game archive")
+    archive.add_argument("kind", choices=["rtp", "busts", "top"])
+    archive.add_argument("--hours", type=float, default=0, help="Only the last N hours (default: all)")
+    archive.set_defaults(func=cmd_archive)
+
+    bulk = sub.add_parser("bulk", help="Set/add/multiply/cap balances of users matching filters")
+    bulk.add_argument("operation", choices=bulk_ops.OPERATIONS)
+    bulk.add_argument("value", type=float)
+    bulk.add_argument("--min-balance", type=int)
+    bulk.add_argument("--max-balance", type=int)
+    bulk.add_argument("--inactive-days", type=float, help="No /daily claim in the last N days")
+    bulk.add_argument("--emoji", help="Only users who own this emoji")
+    bulk.add_argument("--chunk-size", type=positive_int, default=bulk_ops.DEFAULT_CHUNK_SIZE)
+    bulk.add_argument("--dry-run", action="store_true", help="Count matches without writing")
+    bulk.set_defaults(func=cmd_bulk)
+
+    return parser
+
+
+def main(argv: Optional[list] = None) -> None:
+    args = build_parser().parse_args(argv)
+    db = UserDatabase(args.db)
+    args.func(db, args)
+
+
+if __name__ == "__main__":
+    main()
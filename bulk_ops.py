@@ -0,0 +1,208 @@
+"""Predicate-based bulk balance operations.
+
+A Selector picks users (balance range, no /daily since N days, owns an
+emoji); an Operation computes their new balance (set, add, multiply, cap).
+run() streams users, evaluates each chunk in one pass and commits it with
+a single apply_balance_changes() call, then appends one audit summary line
+to DATA_DIR/audit.jsonl (also when a chunk fails). With dry_run nothing is written except the audit
+line, which records the match count and the net change that would apply.
+"""
+import datetime
+import json
+import math
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import DATA_DIR, UserDatabase
+
+AUDIT_LOG = DATA_DIR / "audit.jsonl"
+DEFAULT_CHUNK_SIZE = 500
+OPERATIONS = ("set", "add", "multiply", "cap")
+
+
+@dataclass
+class Selector:
+    min_balance: Optional[int] = None
+    max_balance: Optional[int] = None
+    inactive_days: Optional[float] = None
+    emoji: Optional[str] = None
+
+    def compile(self, now: datetime.datetime):
+        """Return a fast record -> bool predicate."""
+        lo = float("-inf") if self.min_balance is None else self.min_balance
+        hi = float("inf") if self.max_balance is None else self.max_balance
+        # last_daily is a naive ISO timestamp; ISO strings order like the times
+        cutoff = None
+        if self.inactive_days is not None:
+            cutoff = (now - datetime.timedelta(days=self.inactive_days)).isoformat()
+        emoji = self.emoji
+
+        def matches(record: Dict[str, Any]) -> bool:
+            if not lo <= record.get("balance", 0) <= hi:
+                return False
+            if cutoff is not None:
+                last = record.get("last_daily")
+                if last and last >= cutoff:
+                    return False
+            if emoji is not None and emoji not in record.get("emojis", ()):
+                return False
+            return True
+
+        return matches
+
+    def describe(self) -> str:
+        parts = []
+        if self.min_balance is not None:
+            parts.append(f"balance >= {self.min_balance}")
+        if self.max_balance is not None:
+            parts.append(f"balance <= {self.max_balance}")
+        if self.inactive_days is not None:
+            parts.append(f"no /daily for {self.inactive_days:g} days")
+        if self.emoji is not None:
+            parts.append(f"owns {self.emoji}")
+        return " and ".join(parts) or "all users"
+
+
+@dataclass
+class Operation:
+    kind: str
+    value: float
+
+    def __post_init__(self):
+        if self.kind not in OPERATIONS:
+            raise ValueError(f"Unknown operation {self.kind!r}; use one of {', '.join(OPERATIONS)}")
+        if not math.isfinite(self.value):
+            raise ValueError(f"{self.kind} needs a finite value")
+        if self.kind != "add" and self.value < 0:
+            raise ValueError(f"{self.kind} needs a non-negative value")
+
+    def apply(self, balance: int) -> int:
+        """New balance, never below zero."""
+        if self.kind == "set":
+            new = self.value
+        elif self.kind == "add":
+            new = balance + self.value
+        elif self.kind == "multiply":
+            new = balance * self.value
+        else:
+            new = min(balance, self.value)
+        return max(0, int(round(new)))
+
+    def describe(self) -> str:
+        return f"{self.kind} {self.value:g}"
+
+
+def _chunks(db: UserDatabase, matches, chunk_size: int):
+    """Yield lists of (user_id, balance) for matching users."""
+    chunk: List[Tuple[int, int]] = []
+    for user_id, record in db.iter_users():
+        if matches(record):
+            chunk.append((user_id, record.get("balance", 0)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(
+    db: UserDatabase,
+    selector: Selector,
+    operation: Operation,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dry_run: bool = False,
+    actor: str = "cli"
+) -> Dict[str, Any]:
+    """Apply operation to every user matched by selector; returns the audit summary.
+
+    The audit line is written even if a chunk fails; it then covers the chunks
+    committed so far and the error, which is re-raised.
+    """
+    started = time.perf_counter()
+    matches = selector.compile(datetime.datetime.now())
+    matched = changed = chunks = 0
+    net = 0
+    error = None
+
+    try:
+        for chunk in _chunks(db, matches, chunk_size):
+            deltas = {uid: operation.apply(balance) - balance for uid, balance in chunk}
+            deltas = {uid: delta for uid, delta in deltas.items() if delta}
+            if deltas and not dry_run:
+                db.apply_balance_changes(deltas, reason="bulk")
+            matched += len(chunk)
+            changed += len(deltas)
+            net += sum(deltas.values())
+            chunks += 1
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        summary = {
+            "ts": datetime.datetime.now().isoformat(),
+            "actor": actor,
+            "operation": asdict(operation),
+            "selector": {k: v for k, v in asdict(selector).items() if v is not None},
+            "dry_run": dry_run,
+            "matched": matched,
+            "changed": changed,
+            "net_change": net,
+            "chunks": chunks,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        if error is not None:
+            summary["error"] = error
+        with open(AUDIT_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    return summary
+
+
+def parse_command(args: List[str]) -> Tuple[Selector, Operation, bool]:
+    """Parse /bulk arguments: <op> <value> [min=N] [max=N] [inactive=DAYS] [emoji=X] [dry].
+
+    Raises ValueError with a user-facing message on bad input.
+    """
+    if len(args) < 2:
+        raise ValueError("missing operation or value")
+    kind = args[0].lower()
+    try:
+        value = float(args[1])
+    except ValueError:
+        raise ValueError(f"bad value {args[1]!r}")
+    operation = Operation(kind, value)
+
+    selector = Selector()
+    dry_run = False
+    for token in args[2:]:
+        if token.lower() in ("dry", "dry-run", "--dry-run"):
+            dry_run = True
+            continue
+        key, sep, value = token.partition("=")
+        key = key.lower()
+        try:
+            if not sep:
+                raise ValueError
+            if key == "min":
+                selector.min_balance = int(value)
+            elif key == "max":
+                selector.max_balance = int(value)
+            elif key == "inactive":
+                selector.inactive_days = float(value)
+            elif key == "emoji" and value:
+                selector.emoji = value
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"bad filter {token!r}")
+    return selector, operation, dry_run
+
+
+def format_summary(selector: Selector, operation: Operation, summary: Dict[str, Any]) -> str:
+    """One-paragraph report for /bulk and the admin CLI."""
+    verb = "Would change" if summary["dry_run"] else "Changed"
+    return (
+        f"{'🧪 Dry run' if summary['dry_run'] else '✅ Done'}: {operation.describe()} where {selector.describe()}\n"
+        f"Matched {summary['matched']:,} users. {verb} {summary['changed']:,} balances "
+        f"(net {summary['net_change']:+,} Hiwa) in {summary['chunks']} chunks, {summary['seconds']:.2f}s."
+    )
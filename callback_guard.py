@@ -0,0 +1,128 @@
+"""Cheap rejection of duplicate and stale callback queries.
+
+Double taps, client retries and redelivered updates are answered here with
+a bare query.answer() and never reach the game handlers. Three bounded,
+TTL-evicted sets back the check:
+
+- callback query IDs already handled,
+- (chat, message, user, data) taps whose handler completed on a live board,
+- tombstones for board messages whose game has finished.
+"""
+import functools
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from telegram import CallbackQuery, Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+QUERY_TTL = 600.0
+TAP_TTL = 600.0
+TOMBSTONE_TTL = 86400.0
+MAX_QUERIES = 10000
+MAX_TAPS = 10000
+MAX_TOMBSTONES = 50000
+
+# Callback data used on boards that can no longer be played
+DEAD_BOARD_DATA = "ignore"
+
+
+class ExpiringSet:
+    """Insertion-ordered set whose members expire after a fixed TTL."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._expires: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def _prune(self, now: float) -> None:
+        # One TTL for every key, so expiry order equals insertion order
+        expires = self._expires
+        while expires and (len(expires) > self.max_size or next(iter(expires.values())) <= now):
+            expires.popitem(last=False)
+
+    def add(self, key: Hashable, now: float) -> None:
+        self._expires.pop(key, None)
+        self._expires[key] = now + self.ttl
+        self._prune(now)
+
+    def contains(self, key: Hashable, now: float) -> bool:
+        expiry = self._expires.get(key)
+        return expiry is not None and expiry > now
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+
+class CallbackGuard:
+    def __init__(self):
+        self.queries = ExpiringSet(QUERY_TTL, MAX_QUERIES)
+        self.taps = ExpiringSet(TAP_TTL, MAX_TAPS)
+        self.tombstones = ExpiringSet(TOMBSTONE_TTL, MAX_TOMBSTONES)
+        self.passed = 0
+        self.suppressed: Dict[str, int] = {}
+
+    def bury(self, chat_id: int, message_id: Optional[int]) -> None:
+        """Mark a board message as finished; later taps on it are dropped."""
+        if message_id is not None:
+            self.tombstones.add((chat_id, message_id), time.monotonic())
+
+    def check(self, query: CallbackQuery, now: Optional[float] = None) -> Optional[str]:
+        """Return why the query should be suppressed, or None (its id is remembered)."""
+        now = time.monotonic() if now is None else now
+        if self.queries.contains(query.id, now):
+            return "duplicate"
+        self.queries.add(query.id, now)
+
+        message = query.message
+        if query.data == DEAD_BOARD_DATA:
+            return "dead_board"
+        if message is None:
+            return None
+        if self.tombstones.contains((message.chat_id, message.message_id), now):
+            return "dead_board"
+
+        if self.taps.contains(self._tap_key(query), now):
+            return "repeat_tap"
+        return None
+
+    @staticmethod
+    def _tap_key(query: CallbackQuery) -> Tuple:
+        return (query.message.chat_id, query.message.message_id, query.from_user.id, query.data)
+
+    def remember(self, query: CallbackQuery) -> None:
+        """Record a tap as handled; later identical taps are suppressed."""
+        if query.message is not None:
+            self.taps.add(self._tap_key(query), time.monotonic())
+
+
+guard = CallbackGuard()
+
+
+def remember_on_success(handler):
+    """Wrap a callback handler so its tap is only remembered if it returns normally.
+
+    A tap whose handler raised (e.g. a transient edit error) can be retried.
+    """
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        result = await handler(update, context)
+        guard.remember(update.callback_query)
+        return result
+    return wrapper
+
+
+async def filter_callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answer suppressed callback queries and stop further handling."""
+    query = update.callback_query
+    reason = guard.check(query)
+    if reason is None:
+        guard.passed += 1
+        return
+
+    guard.suppressed[reason] = guard.suppressed.get(reason, 0) + 1
+    try:
+        await query.answer("This game is over." if reason == "dead_board" else None)
+    except Exception:
+        pass
+    raise ApplicationHandlerStop
@@ -0,0 +1,146 @@
+"""Startup catch-up for updates queued while the bot was down.
+
+Before live polling starts, the pending backlog is fetched in bulk with
+getUpdates, collapsed, and processed with bounded concurrency:
+
+- callback queries: one per (message, user, data); taps on a board after
+  its owner's cash-out tap are dropped,
+- read-only and once-per-period commands (/daily, /balance, ...): one per
+  (chat, user, command),
+- everything else is kept.
+
+Updates of one chat keep their order; different chats run concurrently.
+The rate limiter is bypassed during the replay, since collapsing already
+removed the redundant updates.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+from telegram import Update
+from telegram.error import TelegramError
+
+import config
+import rate_limit
+
+logger = logging.getLogger(__name__)
+
+# Commands where only one copy per user and chat is worth answering
+COLLAPSIBLE_COMMANDS = {"daily", "weekly", "balance", "leaderboard", "stats", "collection", "store", "help"}
+
+
+def _command(update: Update) -> str:
+    message = update.message
+    if message and message.text and message.text.startswith("/"):
+        return message.text.split()[0][1:].split("@", 1)[0].lower()
+    return ""
+
+
+def _is_owner_cashout(data: str, user_id: int) -> bool:
+    """True if cashout_<owner> data was tapped by the board owner (only that ends the game)."""
+    try:
+        return int(data.split("_")[1]) == user_id
+    except (IndexError, ValueError):
+        return False
+
+
+def collapse(updates: List[Update]) -> Tuple[Dict[int, List[Update]], Dict[str, int]]:
+    """Group updates by chat and drop the redundant ones; returns (per chat, drop counts)."""
+    by_chat: Dict[int, List[Update]] = {}
+    dropped: Dict[str, int] = {}
+    seen = set()
+    cashed_out = set()
+
+    for update in updates:
+        chat = update.effective_chat
+        chat_id = chat.id if chat else 0
+        user_id = update.effective_user.id if update.effective_user else 0
+        key = None
+        reason = ""
+
+        query = update.callback_query
+        if query is not None and query.message is not None:
+            board = (chat_id, query.message.message_id)
+            if board in cashed_out:
+                reason = "finished_board"
+            else:
+                key = ("callback", board, user_id, query.data)
+                reason = "repeat_tap"
+                if query.data and query.data.startswith("cashout_") and _is_owner_cashout(query.data, user_id):
+                    cashed_out.add(board)
+        else:
+            command = _command(update)
+            if command in COLLAPSIBLE_COMMANDS:
+                key = ("command", chat_id, user_id, command)
+                reason = f"/{command}"
+
+        if key is not None:
+            if key not in seen:
+                seen.add(key)
+                reason = ""
+        if reason:
+            dropped[reason] = dropped.get(reason, 0) + 1
+            continue
+        by_chat.setdefault(chat_id, []).append(update)
+
+    return by_chat, dropped
+
+
+async def fetch_backlog(bot, limit: int = config.CATCHUP_MAX_UPDATES) -> List[Update]:
+    """Pull pending updates in pages of 100, confirming them with Telegram."""
+    updates: List[Update] = []
+    offset = 0
+    while True:
+        # Each call with a higher offset confirms everything before it; a page
+        # fetched after the limit stays unconfirmed for live polling
+        page = await bot.get_updates(offset=offset, limit=100, timeout=0)
+        if not page or len(updates) >= limit:
+            break
+        updates.extend(page)
+        offset = page[-1].update_id + 1
+    return updates
+
+
+async def drain_backlog(application, concurrency: int = config.CATCHUP_CONCURRENCY) -> Dict[str, Any]:
+    """Process the queued backlog before live polling starts."""
+    started = time.perf_counter()
+    try:
+        updates = await fetch_backlog(application.bot)
+    except TelegramError as e:
+        logger.warning(f"Skipping backlog catch-up: {e}")
+        return {"backlog": 0, "processed": 0, "chats": 0, "dropped": {}, "seconds": 0.0}
+
+    by_chat, dropped = collapse(updates)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_chat(chat_updates: List[Update]) -> None:
+        async with semaphore:
+            for update in chat_updates:
+                try:
+                    await application.process_update(update)
+                except Exception as e:
+                    logger.error(f"Catch-up update {update.update_id} failed: {e}")
+
+    # A backlog built up over minutes arrives as one burst; don't throttle it
+    application.bot_data[rate_limit.DRAINING_KEY] = True
+    try:
+        await asyncio.gather(*(run_chat(chat_updates) for chat_updates in by_chat.values()))
+    finally:
+        application.bot_data.pop(rate_limit.DRAINING_KEY, None)
+
+    report = {
+        "backlog": len(updates),
+        "processed": sum(len(chat_updates) for chat_updates in by_chat.values()),
+        "chats": len(by_chat),
+        "dropped": dropped,
+        "seconds": time.perf_counter() - started,
+    }
+    application.bot_data["catchup"] = report
+    if updates:
+        logger.info(
+            f"Caught up on {report['backlog']} queued updates in {report['seconds']:.2f}s: "
+            f"{report['processed']} processed across {report['chats']} chats, "
+            f"{sum(dropped.values())} collapsed {dropped}"
+        )
+    return report
@@ -3,5 +3,39 @@ import os
 # Bot token from environment variable
 TOKEN = os.getenv('TOKEN')
 
+# Extra bot tokens served from the same process (comma-separated in TOKENS)
+TOKENS = [t.strip() for t in os.getenv('TOKENS', '').split(',') if t.strip()]
+if TOKEN and TOKEN not in TOKENS:
+    TOKENS.insert(0, TOKEN)
+# The first bot owns users and groups recorded before bots were tracked per record
+_primary = TOKENS[0].split(':', 1)[0] if TOKENS else ''
+PRIMARY_BOT_ID = int(_primary) if _primary.isdigit() else None
+
 # List of admin user IDs
 ADMINS = [6129189597]  # Replace with your Telegram user ID
+
+# Token-bucket rate limits as (capacity, refill tokens per second)
+RATE_LIMIT_USER = (8, 2.0)
+RATE_LIMIT_CHAT = (40, 10.0)
+RATE_LIMIT_FAMILY = {
+    "tap": (6, 3.0),
+    "game": (3, 0.5),
+    "bonus": (2, 0.1),
+    "social": (3, 0.5),
+}
+# Maximum number of idle buckets kept in memory
+RATE_LIMIT_MAX_BUCKETS = 10000
+
+# Startup catch-up: max queued updates fetched, chats processed in parallel
+CATCHUP_MAX_UPDATES = 10000
+CATCHUP_CONCURRENCY = 8
+
+# Seconds between writes of buffered finished games to the archive (0 disables)
+ARCHIVE_FLUSH_INTERVAL = 60
+
+# Seconds between memory usage samples written to DATA_DIR/memory (0 disables)
+MEMORY_REPORT_INTERVAL = 3600
+
+# Read-only HTTP API for dashboards (0 disables); binds to localhost by default
+HTTP_API_HOST = os.getenv('HTTP_API_HOST', '127.0.0.1')
+HTTP_API_PORT = int(os.getenv('HTTP_API_PORT', '0'))
@@ -1,16 +1,31 @@
 import json
 import os
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterator, Callable
 import datetime  # Added import for time handling
+import logging
+from contextlib import contextmanager
 from pathlib import Path
 
+from user_store import DictUserStore, TieredUserStore
+
 DATA_DIR = Path(os.getenv("PERSISTENT_STORAGE_PATH", "persistent_data"))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# When > 0, keep at most this many users in memory and the rest in an SQLite file
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "0"))
+
+logger = logging.getLogger(__name__)
+
 class UserDatabase:
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, cache_size: Optional[int] = None):
         self.filename = str(DATA_DIR / filename)
+        self.cache_size = USER_CACHE_SIZE if cache_size is None else cache_size
         self.data = self._load_data()
+        self._batch_depth = 0
+        self._dirty = False
+        # Bumped on every change; lets readers cache derived views
+        self.version = 0
+        self._balance_listeners: List[Callable[[int, int, int, str], None]] = []
         self.emoji_store = [
             {'emoji': '💎', 'price': 100, 'description': 'Gem'}, 
             {'emoji': '⭐', 'price': 1000, 'description': 'Shiny Star'},
@@ -58,40 +73,147 @@ class UserDatabase:
         user['selected_emoji'] = emoji
         self._save_data()  # Fixed method name
 
+    def get_client_seed(self, user_id: int) -> str:
+        """Player-chosen client seed for provably fair boards (defaults to the user ID)."""
+        user = self.data["users"].get(str(user_id), {})
+        return user.get("client_seed") or str(user_id)
+
+    def set_client_seed(self, user_id: int, client_seed: str) -> None:
+        user = self.data["users"].setdefault(str(user_id), {})
+        user["client_seed"] = client_seed
+        self._save_data()
+
+    def next_nonce(self, user_id: int) -> int:
+        """Return the user's nonce for a new game and advance it, so no two games share a layout."""
+        user = self.data["users"].setdefault(str(user_id), {})
+        nonce = user.get("nonce", 0)
+        user["nonce"] = nonce + 1
+        self._save_data()
+        return nonce
+
+    def save_sessions(self, sessions: Dict[str, Any]) -> None:
+        """Store serialized live games (chat_id -> user_id -> state) until the next start."""
+        self.data["sessions"] = sessions
+        self._save_data()
+
+    def pop_sessions(self) -> Dict[str, Any]:
+        """Return and forget the live games stored by save_sessions()."""
+        sessions = self.data.pop("sessions", None) or {}
+        if sessions:
+            self._save_data()
+        return sessions
+
     def _load_data(self) -> Dict[str, Any]:
         """Load user data from JSON file."""
         # If the file doesn’t exist yet, initialize both users and groups
         if not os.path.exists(self.filename):
-            return {"users": {}, "groups": []}
-
-        # Otherwise open and parse it
-        with open(self.filename, 'r') as f:
-            data = json.load(f)
+            data = {"users": {}, "groups": [], "game_stats": {}, "tournaments": {}}
+        else:
+            # Otherwise open and parse it
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
 
         # Ensure legacy files get a groups key
         if "groups" not in data:
             data["groups"] = []
+        data.setdefault("game_stats", {})
+        data.setdefault("tournaments", {})
+
+        users = data.get("users") or {}
+        db_path = os.path.splitext(self.filename)[0] + ".db"
+        if self.cache_size > 0:
+            store = TieredUserStore(db_path, self.cache_size)
+            if users:
+                # One-time migration of users out of the JSON file
+                store.import_records(users)
+                os.replace(self.filename, self.filename + ".pre-tiered")
+                with open(self.filename, 'w') as f:
+                    json.dump({key: value for key, value in data.items() if key != "users"}, f, indent=2)
+                logger.info(f"Moved {len(users)} users from {self.filename} to tiered storage")
+            data["users"] = store
+        else:
+            if os.path.exists(db_path):
+                users = self._migrate_from_tiered(db_path, data, users)
+            data["users"] = DictUserStore(users)
 
         return data
+
+    def _migrate_from_tiered(self, db_path: str, data: Dict[str, Any], users: Dict[str, Any]) -> Dict[str, Any]:
+        """Tiered storage was switched off: move its users back into the JSON file.
+
+        The SQLite file is renamed afterwards, so switching tiering on again
+        later starts from the JSON users instead of merging stale records.
+        """
+        store = TieredUserStore(db_path, 1)
+        try:
+            merged = dict(store.iter_records())
+        finally:
+            store.close()
+        merged.update(users)
+        tmp = self.filename + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({**data, "users": merged}, f, indent=2)
+        os.replace(tmp, self.filename)
+        os.replace(db_path, db_path + ".pre-json")
+        logger.info(f"Moved {len(merged)} users from {db_path} back to {self.filename}")
+        return merged
     
-    def add_group(self, group_id: int) -> None:
+    def add_group(self, group_id: int, bot_id: Optional[int] = None) -> None:
         """Add a group to the database if not already present"""
+        changed = False
         if group_id not in self.data["groups"]:
             self.data["groups"].append(group_id)
+            changed = True
+        if bot_id is not None:
+            bot_groups = self.data.setdefault("bot_groups", {}).setdefault(str(bot_id), [])
+            if group_id not in bot_groups:
+                bot_groups.append(group_id)
+                changed = True
+        if changed:
             self._save_data()
 
-    def remove_group(self, group_id: int) -> None:
+    def remove_group(self, group_id: int, bot_id: Optional[int] = None) -> None:
         """Remove a group from the database"""
-        if group_id in self.data["groups"]:
+        changed = False
+        bot_groups = self.data.get("bot_groups", {})
+        if bot_id is not None and group_id in bot_groups.get(str(bot_id), []):
+            bot_groups[str(bot_id)].remove(group_id)
+            changed = True
+        still_used = any(group_id in groups for groups in bot_groups.values())
+        if group_id in self.data["groups"] and not still_used:
             self.data["groups"].remove(group_id)
+            changed = True
+        if changed:
             self._save_data()
 
-    def get_all_groups(self) -> List[int]:
-        """Get all group IDs where the bot is present"""
-        return self.data["groups"]
+    def get_all_groups(self, bot_id: Optional[int] = None, include_legacy: bool = False) -> List[int]:
+        """Get all group IDs where the bot is present (all bots if bot_id is None).
+
+        include_legacy adds groups recorded before groups were tracked per bot.
+        """
+        if bot_id is None:
+            return self.data["groups"]
+        bot_groups = self.data.get("bot_groups", {})
+        groups = list(bot_groups.get(str(bot_id), []))
+        if include_legacy:
+            attributed = {group for groups_of_bot in bot_groups.values() for group in groups_of_bot}
+            groups.extend(group for group in self.data["groups"] if group not in attributed)
+        return groups
     
     def _save_data(self) -> None:
-        """Save user data to JSON file."""
+        """Save user data to JSON file (deferred while inside batch())."""
+        self.version += 1
+        if self._batch_depth:
+            self._dirty = True
+            return
+        self._dirty = False
+        users = self.data["users"]
+        if isinstance(users, TieredUserStore):
+            users.flush()
+            meta = {key: value for key, value in self.data.items() if key != "users"}
+            with open(self.filename, 'w') as f:
+                json.dump(meta, f, indent=2)
+            return
         with open(self.filename, 'w') as f:
             json.dump(self.data, f, indent=2)
     
@@ -102,7 +224,8 @@ class UserDatabase:
         """Check if a user exists in the database."""
         return str(user_id) in self.data["users"]
     
-    def add_user(self, user_id: int, username: Optional[str], first_name: str, balance: int = 100) -> None:
+    def add_user(self, user_id: int, username: Optional[str], first_name: str, balance: int = 100,
+                 bot_id: Optional[int] = None) -> None:
         """Add a new user, storing both Telegram username (if any) and first name."""
         self.data["users"][str(user_id)] = {
             "username": username or "",
@@ -111,33 +234,97 @@ class UserDatabase:
             "last_daily": None,
             "last_weekly": None
         }
+        if bot_id is not None:
+            self.data["users"][str(user_id)]["bots"] = [bot_id]
+        self._notify_balance(user_id, 0, balance, "signup")
         self._save_data()
     
+    def get_user_record(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Raw stored record for a user, or None."""
+        return self.data["users"].get(str(user_id))
+
+    def record_chat(self, user_id: int, chat_id: int, limit: int = 20) -> bool:
+        """Remember that a user is active in a chat; True if the chat is new for them."""
+        user = self.data["users"].get(str(user_id))
+        if user is None:
+            return False
+        chats = user.setdefault("chats", [])
+        if chat_id in chats:
+            return False
+        chats.append(chat_id)
+        del chats[:-limit]
+        self._save_data()
+        return True
+
+    def add_balance_listener(self, listener: Callable[[int, int, int, str], None]) -> None:
+        """Register listener(user_id, old_balance, new_balance, reason) for every balance change."""
+        self._balance_listeners.append(listener)
+
+    def _notify_balance(self, user_id: int, old: int, new: int, reason: str = "") -> None:
+        self.version += 1
+        for listener in self._balance_listeners:
+            try:
+                listener(int(user_id), old, new, reason)
+            except Exception as e:
+                logger.error(f"Balance listener failed for {user_id}: {e}")
+
     def get_balance(self, user_id: int) -> int:
         """Get a user's balance."""
         return self.data["users"][str(user_id)]["balance"]
     
-    def set_balance(self, user_id: int, amount: float) -> None:
+    def set_balance(self, user_id: int, amount: float, reason: str = "admin") -> None:
         """Set balance to whole numbers only"""
-        self.data["users"][str(user_id)]["balance"] = int(round(amount))
+        user = self.data["users"][str(user_id)]
+        old = user["balance"]
+        user["balance"] = int(round(amount))
+        self._notify_balance(user_id, old, user["balance"], reason)
         self._save_data()
     
     def has_sufficient_balance(self, user_id: int, amount: int) -> bool:
         """Check if user has sufficient balance."""
         return self.get_balance(user_id) >= amount
     
-    def add_balance(self, user_id: int, amount: float) -> None:
+    def add_balance(self, user_id: int, amount: float, reason: str = "") -> None:
         """Add whole number Hiwa only"""
         amount = int(round(amount))  # Convert to nearest integer
-        self.data["users"][str(user_id)]["balance"] += amount
+        user = self.data["users"][str(user_id)]
+        user["balance"] += amount
+        self._notify_balance(user_id, user["balance"] - amount, user["balance"], reason)
         self._save_data()
 
-    def deduct_balance(self, user_id: int, amount: float) -> None:
+    def deduct_balance(self, user_id: int, amount: float, reason: str = "") -> None:
         """Deduct whole number Hiwa only"""
         amount = int(round(amount))  # Convert to nearest integer
-        self.data["users"][str(user_id)]["balance"] -= amount
+        user = self.data["users"][str(user_id)]
+        user["balance"] -= amount
+        self._notify_balance(user_id, user["balance"] + amount, user["balance"], reason)
         self._save_data()
     
+    def apply_balance_changes(self, changes: Dict[int, int], reason: str = "") -> Dict[int, int]:
+        """Apply several balance deltas all-or-nothing with a single save.
+
+        Raises ValueError (and changes nothing) if a user is missing or any
+        balance would go negative. Returns the new balances.
+        """
+        users = self.data["users"]
+        new_balances = {}
+        for user_id, delta in changes.items():
+            user = users.get(str(user_id))
+            if user is None:
+                raise ValueError(f"Unknown user {user_id}")
+            new_balances[user_id] = user["balance"] + int(round(delta))
+            if new_balances[user_id] < 0:
+                raise ValueError(f"Insufficient balance for user {user_id}")
+
+        with self.batch():
+            for user_id, balance in new_balances.items():
+                user = users[str(user_id)]
+                old = user["balance"]
+                user["balance"] = balance
+                self._notify_balance(user_id, old, balance, reason)
+            self._save_data()
+        return new_balances
+
     def get_last_daily(self, user_id: int):
         """Get last daily bonus claim time."""
         last = self.data["users"][str(user_id)]["last_daily"]
@@ -158,9 +345,73 @@ class UserDatabase:
         self.data["users"][str(user_id)]["last_weekly"] = time.isoformat()
         self._save_data()
     
+    def record_game_result(self, user_id: int, mines: int, bet: int, payout: int, multiplier: float, outcome: str) -> None:
+        """Update per-user and per-mines-count counters for a finished game.
+
+        outcome is 'win', 'bust' or 'cancel'; cancelled games are refunded and
+        only bump the cancel counter.
+        """
+        user = self.data["users"].get(str(user_id))
+        if user is None:
+            return
+        stats = user.setdefault("stats", {
+            "games": 0, "wins": 0, "busts": 0, "cancelled": 0,
+            "wagered": 0, "won": 0, "best_multiplier": 0.0,
+            "streak": 0, "longest_streak": 0
+        })
+        totals = self.data["game_stats"].setdefault(str(mines), {
+            "games": 0, "wins": 0, "busts": 0, "cancelled": 0, "wagered": 0, "paid_out": 0
+        })
+
+        if outcome == "cancel":
+            stats["cancelled"] += 1
+            totals["cancelled"] += 1
+        else:
+            stats["games"] += 1
+            stats["wagered"] += bet
+            totals["games"] += 1
+            totals["wagered"] += bet
+            if outcome == "win":
+                stats["wins"] += 1
+                stats["won"] += payout
+                stats["best_multiplier"] = max(stats["best_multiplier"], round(multiplier, 2))
+                stats["streak"] += 1
+                stats["longest_streak"] = max(stats["longest_streak"], stats["streak"])
+                totals["wins"] += 1
+                totals["paid_out"] += payout
+            else:
+                stats["busts"] += 1
+                stats["streak"] = 0
+                totals["busts"] += 1
+        self._save_data()
+
+    def get_user_stats(self, user_id: int) -> Dict[str, Any]:
+        """Per-user game counters (empty dict if they never played)."""
+        return self.data["users"].get(str(user_id), {}).get("stats", {})
+
+    def record_tournament_entry(self, chat_id: int, bot_id: int, entry_fee: int, user_id: int) -> None:
+        """Remember a paid tournament entry until the tournament settles."""
+        entry = self.data["tournaments"].setdefault(
+            str(chat_id), {"bot_id": bot_id, "entry_fee": entry_fee, "entrants": []}
+        )
+        entry["entrants"].append(user_id)
+        self._save_data()
+
+    def clear_tournament(self, chat_id: int) -> None:
+        if self.data["tournaments"].pop(str(chat_id), None) is not None:
+            self._save_data()
+
+    def open_tournaments(self) -> Dict[int, Dict[str, Any]]:
+        """Paid entries of tournaments that never settled, keyed by chat id."""
+        return {int(chat_id): entry for chat_id, entry in self.data["tournaments"].items()}
+
+    def get_game_stats(self) -> Dict[int, Dict[str, int]]:
+        """Global counters keyed by mines count."""
+        return {int(mines): totals for mines, totals in self.data["game_stats"].items()}
+
     def get_top_users(self, limit: int = 10) -> List[Tuple[int, str, str, int]]:
         users = []
-        for uid, data in self.data["users"].items():
+        for uid, data in self.data["users"].top_by_balance(limit):
             try:
                 balance = int(data.get("balance", 0))
                 users.append((
@@ -175,23 +426,83 @@ class UserDatabase:
     
     def get_user_id_by_username(self, username: str) -> Optional[int]:
         """Get user ID by username."""
-        username = username.lower()
-        for user_id, data in self.data["users"].items():
-            if data["username"].lower() == username:
-                return int(user_id)
-        return None
+        user_id = self.data["users"].find_username(username)
+        return int(user_id) if user_id is not None else None
     
     def get_all_users(self) -> List[int]:
         """Get all user IDs."""
-        return [int(user_id) for user_id in self.data["users"].keys()]
+        return [int(user_id) for user_id in self.data["users"]]
+
+    def record_bot(self, user_id: int, bot_id: int, legacy_bot_id: Optional[int] = None) -> bool:
+        """Remember that a user talks to a bot; written with the next save. True if new.
+
+        Records from before bots were tracked get legacy_bot_id (if any) too.
+        """
+        user = self.data["users"].get(str(user_id))
+        if user is None:
+            return False
+        bots = user.get("bots")
+        if bots is None:
+            bots = user["bots"] = [legacy_bot_id] if legacy_bot_id is not None else []
+            self.mark_dirty()
+        if bot_id in bots:
+            return False
+        bots.append(bot_id)
+        self.mark_dirty()
+        return True
+
+    def get_bot_users(self, bot_id: int, include_legacy: bool = False) -> List[int]:
+        """IDs of users who talked to a bot; include_legacy adds users never tracked per bot."""
+        return [
+            user_id for user_id, record in self.iter_users()
+            if bot_id in record.get("bots", ()) or (include_legacy and "bots" not in record)
+        ]
+
+    def iter_users(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (user_id, record) pairs one at a time."""
+        for user_id, record in self.data["users"].iter_records():
+            yield int(user_id), record
+
+    def update_users(self, fn: Callable[[int, Dict[str, Any]], bool]) -> int:
+        """Apply fn(user_id, record) to every user, persisting records it reports changed."""
+        return self.data["users"].update_all(lambda key, record: fn(int(key), record))
+
+    def storage_stats(self) -> Dict[str, int]:
+        """Resident vs total users (plus cache hits/misses when tiered)."""
+        return self.data["users"].stats()
+
+    @contextmanager
+    def batch(self):
+        """Group several mutations into a single save when the block exits."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self._dirty = False
+                self._save_data()
+
+    def mark_dirty(self) -> None:
+        """Note an in-place change to be written by the next save instead of now."""
+        self.version += 1
+        self._dirty = True
+
+    def flush(self) -> None:
+        """Write changes left by mark_dirty(), if any."""
+        if self._dirty and not self._batch_depth:
+            self._save_data()
 
     def reset_all_balances_to_100(self) -> None:
         """Reset every user's balance to 100 without deleting any user data."""
-        # Ensure there is a users dict
-        users = self.data.get("users", {})
-        for user_id, user_info in users.items():
+        def reset(user_id: str, user_info: Dict[str, Any]) -> bool:
             # Set each user's balance to 100
+            old = user_info.get("balance", 0)
             user_info["balance"] = 100
+            self._notify_balance(user_id, old, 100, "admin")
+            return True
+
+        self.data["users"].update_all(reset)
 
         # Persist the change
         self._save_data()
@@ -0,0 +1,134 @@
+"""Incremental Hiwa economy counters.
+
+Every balance change reaches Economy.on_balance_change with a reason tag
+("bet", "payout", "daily", ...). Money supply is seeded by one scan at
+startup and then kept up to date from the deltas; issuance and sinks are
+totalled per reason, all-time and over rolling 1m/1h/24h ring buffers.
+"""
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+from database import UserDatabase
+
+BUCKETS_PER_WINDOW = 60
+WINDOWS = {"1m": 60, "1h": 3600, "24h": 86400}
+
+# House profit = bets taken - payouts - refunds of cancelled games
+HOUSE_IN = ("bet",)
+HOUSE_OUT = ("payout", "refund")
+
+
+class RollingWindow:
+    """Per-reason issued/sunk sums over the last `span` seconds.
+
+    The span is split into fixed buckets; a bucket is reset lazily the
+    first time it is touched in a new epoch, so an update is O(1) and a
+    read sums at most `buckets` counters.
+    """
+
+    def __init__(self, span: float, buckets: int = BUCKETS_PER_WINDOW):
+        self.span = span
+        self.width = span / buckets
+        self.epochs: List[int] = [-1] * buckets
+        self.issued: List[Counter] = [Counter() for _ in range(buckets)]
+        self.sunk: List[Counter] = [Counter() for _ in range(buckets)]
+
+    def _bucket(self, now: float) -> int:
+        epoch = int(now // self.width)
+        i = epoch % len(self.epochs)
+        if self.epochs[i] != epoch:
+            self.epochs[i] = epoch
+            self.issued[i].clear()
+            self.sunk[i].clear()
+        return i
+
+    def add(self, now: float, reason: str, delta: int) -> None:
+        i = self._bucket(now)
+        if delta > 0:
+            self.issued[i][reason] += delta
+        else:
+            self.sunk[i][reason] -= delta
+
+    def totals(self, now: float) -> Tuple[Counter, Counter]:
+        """(issued, sunk) per reason across the live buckets."""
+        oldest = int(now // self.width) - len(self.epochs) + 1
+        issued: Counter = Counter()
+        sunk: Counter = Counter()
+        for i, epoch in enumerate(self.epochs):
+            if epoch >= oldest:
+                issued.update(self.issued[i])
+                sunk.update(self.sunk[i])
+        return issued, sunk
+
+
+class Economy:
+    def __init__(self, db: UserDatabase, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.supply = 0
+        self.users = 0
+        for _, record in db.iter_users():
+            self.supply += record.get("balance", 0)
+            self.users += 1
+        self.issued: Counter = Counter()
+        self.sunk: Counter = Counter()
+        self.windows = {name: RollingWindow(span) for name, span in WINDOWS.items()}
+        db.add_balance_listener(self.on_balance_change)
+
+    def on_balance_change(self, user_id: int, old: int, new: int, reason: str = "") -> None:
+        if reason == "signup":
+            self.users += 1
+        delta = new - old
+        if not delta:
+            return
+        reason = reason or "other"
+        self.supply += delta
+        if delta > 0:
+            self.issued[reason] += delta
+        else:
+            self.sunk[reason] -= delta
+        now = self.clock()
+        for window in self.windows.values():
+            window.add(now, reason, delta)
+
+    @staticmethod
+    def house_profit(issued: Counter, sunk: Counter) -> int:
+        return sum(sunk[r] for r in HOUSE_IN) - sum(issued[r] for r in HOUSE_OUT)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """All-time and per-window figures keyed by window name ("all" for all-time)."""
+        now = self.clock()
+        periods = {"all": (self.issued, self.sunk)}
+        for name, window in self.windows.items():
+            periods[name] = window.totals(now)
+        return {
+            name: {
+                "issued": dict(issued),
+                "sunk": dict(sunk),
+                "house_profit": self.house_profit(issued, sunk),
+            }
+            for name, (issued, sunk) in periods.items()
+        }
+
+    def report(self) -> str:
+        """Text summary for /economy."""
+        snap = self.snapshot()
+        lines = [
+            "🏦 Hiwa economy",
+            f"Supply: {self.supply:,} Hiwa across {self.users:,} users",
+            "",
+        ]
+        for name in ("1m", "1h", "24h", "all"):
+            period = snap[name]
+            issued, sunk = Counter(period["issued"]), Counter(period["sunk"])
+            label = "All time" if name == "all" else f"Last {name}"
+            lines.append(f"<b>{label}</b>")
+            lines.append(f"House profit: {period['house_profit']:+,}")
+            lines.append(
+                f"Bonuses: {issued['daily']:,} daily, {issued['weekly']:,} weekly | "
+                f"Store: {sunk['store']:,} | Gifts: {sunk['gift']:,} moved"
+            )
+            minted = sum(issued.values()) - sum(sunk.values())
+            lines.append(f"Net issuance: {minted:+,}")
+            lines.append("")
+        return "\n".join(lines).rstrip()
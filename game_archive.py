@@ -0,0 +1,287 @@
+"""Append-only columnar archive of finished games.
+
+Rows are buffered in memory and written as chunks under DATA_DIR/archive,
+when the buffer is full and on a timer (start_flushing), so a crash loses at
+most one interval of games.
+Each chunk is a directory with one raw typed-array file per column plus a
+meta.json zone map (row count, time and mines ranges). Queries skip chunks
+by their zone map and load only the columns they use.
+"""
+import asyncio
+import datetime
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from database import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = DATA_DIR / "archive"
+CHUNK_ROWS = 4096
+NO_POSITION = 255
+
+OUTCOME_CODES = {"win": 1, "bust": 0, "cancel": -1}
+
+# column name -> array typecode (fixed width, native byte order)
+COLUMNS = {
+    "ts": "d",
+    "user_id": "q",
+    "chat_id": "q",
+    "mines": "B",
+    "bet": "q",
+    "payout": "q",
+    "multiplier": "d",
+    "outcome": "b",
+    "gems": "B",
+    "mine_mask": "I",
+    "reveal_mask": "I",
+    "bust_pos": "B",
+    "reveal_order": "B",   # 25 slots per row, NO_POSITION padded
+}
+ORDER_WIDTH = 25
+# Byte width each typecode must have for chunk files to be portable
+WIDTHS = {"d": 8, "q": 8, "I": 4, "B": 1, "b": 1}
+for _code in set(COLUMNS.values()):
+    if array(_code).itemsize != WIDTHS[_code]:
+        raise RuntimeError(f"array typecode {_code!r} is not {WIDTHS[_code]} bytes on this platform")
+
+# Chunks written before FORMAT 2 stored the masks as platform-sized "L"
+FORMAT = 2
+LEGACY_COLUMNS = {"mine_mask": "L", "reveal_mask": "L"}
+
+
+class GameArchive:
+    def __init__(self, path=ARCHIVE_DIR, chunk_rows: int = CHUNK_ROWS):
+        self.path = str(path)
+        self.chunk_rows = chunk_rows
+        os.makedirs(self.path, exist_ok=True)
+        self._buffer = self._empty_columns()
+        self._buffered = 0
+        self._flusher: Optional[asyncio.Task] = None
+        self._chunks = sorted(
+            name for name in os.listdir(self.path)
+            if name.startswith("chunk-") and os.path.exists(os.path.join(self.path, name, "meta.json"))
+        )
+
+    @staticmethod
+    def _empty_columns() -> Dict[str, array]:
+        return {name: array(code) for name, code in COLUMNS.items()}
+
+    # -- writing ------------------------------------------------------------
+
+    def append(self, user_id: int, chat_id: int, game, payout: int, outcome: str,
+               ts: Optional[float] = None) -> None:
+        """Buffer one finished MinesGame."""
+        order = list(getattr(game, "reveals", []))[:ORDER_WIDTH]
+        mine_mask = game.mine_mask
+        bust = next((pos for pos in order if mine_mask >> pos & 1), NO_POSITION)
+        # From the taps themselves: a bust marks every tile revealed on the board
+        reveal_mask = 0
+        for pos in order:
+            reveal_mask |= 1 << pos
+
+        buf = self._buffer
+        buf["ts"].append(time.time() if ts is None else ts)
+        buf["user_id"].append(user_id)
+        buf["chat_id"].append(chat_id)
+        buf["mines"].append(game.mines_count)
+        buf["bet"].append(game.bet_amount)
+        buf["payout"].append(payout)
+        buf["multiplier"].append(game.current_multiplier)
+        buf["outcome"].append(OUTCOME_CODES[outcome])
+        buf["gems"].append(game.gems_revealed)
+        buf["mine_mask"].append(mine_mask)
+        buf["reveal_mask"].append(reveal_mask)
+        buf["bust_pos"].append(bust)
+        buf["reveal_order"].extend(order + [NO_POSITION] * (ORDER_WIDTH - len(order)))
+        self._buffered += 1
+
+        if self._buffered >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows as a new chunk."""
+        if not self._buffered:
+            return
+        name = f"chunk-{len(self._chunks) + 1:06d}"
+        chunk_dir = os.path.join(self.path, name)
+        os.makedirs(chunk_dir, exist_ok=True)
+        for column, values in self._buffer.items():
+            with open(os.path.join(chunk_dir, f"{column}.bin"), "wb") as f:
+                values.tofile(f)
+
+        ts, mines = self._buffer["ts"], self._buffer["mines"]
+        meta = {
+            "format": FORMAT,
+            "rows": self._buffered,
+            "ts_min": min(ts), "ts_max": max(ts),
+            "mines_min": min(mines), "mines_max": max(mines),
+        }
+        # meta.json is written last; a chunk without it is ignored
+        with open(os.path.join(chunk_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        self._chunks.append(name)
+        self._buffer = self._empty_columns()
+        self._buffered = 0
+
+    def start_flushing(self, interval: float) -> None:
+        """Write buffered rows every `interval` seconds; once per process."""
+        if interval <= 0 or (self._flusher is not None and not self._flusher.done()):
+            return
+
+        async def run() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Archive flush failed: {e}")
+
+        self._flusher = asyncio.get_running_loop().create_task(run())
+
+    async def stop_flushing(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+    # -- reading ------------------------------------------------------------
+
+    def _scan(self, columns: Sequence[str], since: Optional[float] = None,
+              until: Optional[float] = None, mines: Optional[int] = None) -> Iterator[Dict[str, array]]:
+        """Yield {column: array} per chunk that may match the filters."""
+        for name in self._chunks:
+            chunk_dir = os.path.join(self.path, name)
+            with open(os.path.join(chunk_dir, "meta.json")) as f:
+                meta = json.load(f)
+            if since is not None and meta["ts_max"] < since:
+                continue
+            if until is not None and meta["ts_min"] > until:
+                continue
+            if mines is not None and not meta["mines_min"] <= mines <= meta["mines_max"]:
+                continue
+
+            data = {}
+            legacy = meta.get("format", 1) < FORMAT
+            for column in columns:
+                values = array(LEGACY_COLUMNS.get(column, COLUMNS[column]) if legacy else COLUMNS[column])
+                width = ORDER_WIDTH if column == "reveal_order" else 1
+                with open(os.path.join(chunk_dir, f"{column}.bin"), "rb") as f:
+                    values.fromfile(f, meta["rows"] * width)
+                data[column] = values
+            yield data
+
+        if self._buffered:
+            yield {column: self._buffer[column] for column in columns}
+
+    @staticmethod
+    def _row_filter(data: Dict[str, array], since, until, mines) -> List[bool]:
+        n = len(data["ts"])
+        keep = [True] * n
+        if since is not None or until is not None:
+            lo = float("-inf") if since is None else since
+            hi = float("inf") if until is None else until
+            keep = [lo <= t <= hi for t in data["ts"]]
+        if mines is not None:
+            keep = [k and m == mines for k, m in zip(keep, data["mines"])]
+        return keep
+
+    def rtp_by_mines(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[int, Dict[str, float]]:
+        """Games, wagered, paid out and RTP per mines count (cancelled games excluded)."""
+        wagered: Counter = Counter()
+        paid: Counter = Counter()
+        games: Counter = Counter()
+        for data in self._scan(("ts", "mines", "bet", "payout", "outcome"), since, until):
+            keep = self._row_filter(data, since, until, None)
+            for k, m, bet, payout, outcome in zip(keep, data["mines"], data["bet"], data["payout"], data["outcome"]):
+                if k and outcome >= 0:
+                    games[m] += 1
+                    wagered[m] += bet
+                    paid[m] += payout
+        return {
+            m: {"games": games[m], "wagered": wagered[m], "paid": paid[m],
+                "rtp": paid[m] / wagered[m] if wagered[m] else 0.0}
+            for m in sorted(games)
+        }
+
+    def bust_distribution(self, mines: Optional[int] = None, since: Optional[float] = None,
+                          until: Optional[float] = None) -> Tuple[Counter, Counter]:
+        """(busts by reveal step, busts by board position) for busted games."""
+        by_step: Counter = Counter()
+        by_tile: Counter = Counter()
+        for data in self._scan(("ts", "mines", "outcome", "gems", "bust_pos"), since, until, mines):
+            keep = self._row_filter(data, since, until, mines)
+            for k, outcome, gems, pos in zip(keep, data["outcome"], data["gems"], data["bust_pos"]):
+                if k and outcome == 0:
+                    by_step[gems + 1] += 1
+                    if pos != NO_POSITION:
+                        by_tile[pos] += 1
+        return by_step, by_tile
+
+    def top_wins(self, limit: int = 10, since: Optional[float] = None,
+                 until: Optional[float] = None) -> List[Tuple[int, float, int, int, float]]:
+        """Largest net wins as (net, ts, user_id, mines, multiplier)."""
+        best: List[Tuple[int, float, int, int, float]] = []
+        columns = ("ts", "user_id", "mines", "bet", "payout", "multiplier", "outcome")
+        for data in self._scan(columns, since, until):
+            keep = self._row_filter(data, since, until, None)
+            rows = zip(keep, data["ts"], data["user_id"], data["mines"], data["bet"],
+                       data["payout"], data["multiplier"], data["outcome"])
+            candidates = ((payout - bet, ts, uid, m, mult)
+                          for k, ts, uid, m, bet, payout, mult, outcome in rows if k and outcome == 1)
+            best = heapq.nlargest(limit, itertools.chain(best, candidates))
+        return best
+
+    def row_count(self) -> int:
+        total = self._buffered
+        for name in self._chunks:
+            with open(os.path.join(self.path, name, "meta.json")) as f:
+                total += json.load(f)["rows"]
+        return total
+
+
+def format_report(archive: GameArchive, kind: str, hours: float) -> str:
+    """Render an archive query for /archive and the admin CLI."""
+    since = time.time() - hours * 3600 if hours else None
+    span = f"last {hours:g}h" if hours else "all time"
+
+    if kind == "rtp":
+        rows = archive.rtp_by_mines(since=since)
+        if not rows:
+            return f"No archived games ({span})."
+        lines = [f"📈 RTP by mines ({span})"]
+        for mines, r in rows.items():
+            lines.append(f"{mines} 💣: {r['games']} games, {r['wagered']:,} in, {r['paid']:,} out, RTP {r['rtp']:.1%}")
+        return "\n".join(lines)
+
+    if kind == "busts":
+        by_step, by_tile = archive.bust_distribution(since=since)
+        total = sum(by_step.values())
+        if not total:
+            return f"No busted games ({span})."
+        lines = [f"💥 Busts by reveal step ({span}, {total} busts)"]
+        for step in sorted(by_step):
+            lines.append(f"Tap {step}: {by_step[step] / total:.1%}")
+        hottest = ", ".join(f"({pos // 5},{pos % 5}) {count}" for pos, count in by_tile.most_common(5))
+        lines.append(f"Most common bust tiles: {hottest}")
+        return "\n".join(lines)
+
+    rows = archive.top_wins(10, since=since)
+    if not rows:
+        return f"No winning games ({span})."
+    lines = [f"🏅 Top wins ({span})"]
+    for i, (net, ts, uid, mines, mult) in enumerate(rows, start=1):
+        when = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+        lines.append(f"{i}. user {uid}: +{net:,} Hiwa at {mult:.2f}x ({mines} 💣, {when})")
+    return "\n".join(lines)
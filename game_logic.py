@@ -1,7 +1,12 @@
 from telegram import User, InlineKeyboardMarkup, InlineKeyboardButton
 from dataclasses import dataclass
-from typing import List, Tuple
-import random
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import hmac
+import secrets
+
+BOARD_SIZE = 5
+TILE_COUNT = BOARD_SIZE * BOARD_SIZE
 
 @dataclass
 class Tile:
@@ -9,28 +14,84 @@ class Tile:
         self.value = value
         self.revealed = False
 
+def new_server_seed() -> str:
+    """Fresh secret server seed (hex)."""
+    return secrets.token_hex(32)
+
+def hash_server_seed(server_seed: str) -> str:
+    """SHA-256 commitment shown to the player before the game starts."""
+    return hashlib.sha256(server_seed.encode()).hexdigest()
+
+def _mask(keyed: "hmac.HMAC", client_seed: str, nonce: int, mines: int) -> int:
+    """mine_mask() from an HMAC already keyed with the server seed (copied per round)."""
+    positions = list(range(TILE_COUNT))
+    mask = 0
+    words: List[int] = []
+    rnd = 0
+    for k in range(mines):
+        if not words:
+            h = keyed.copy()
+            h.update(f"{client_seed}:{nonce}:{rnd}".encode())
+            digest = h.digest()
+            words = [int.from_bytes(digest[i:i + 4], "big") for i in range(28, -1, -4)]
+            rnd += 1
+        j = k + ((words.pop() * (TILE_COUNT - k)) >> 32)
+        positions[k], positions[j] = positions[j], positions[k]
+        mask |= 1 << positions[k]
+    return mask
+
+def mine_mask(server_seed: str, client_seed: str, nonce: int, mines: int) -> int:
+    """Derive the mine layout as a 25-bit mask (bit i*5+j set = mine at row i, col j).
+
+    Mines are the first `mines` picks of a Fisher-Yates shuffle driven by
+    HMAC-SHA256(server_seed, "client_seed:nonce:round"), 8 x 32-bit words per round.
+    """
+    return _mask(hmac.new(server_seed.encode(), digestmod=hashlib.sha256), client_seed, nonce, mines)
+
+def generate_layouts(server_seed: str, client_seed: str, mines: int, count: int, start_nonce: int = 0) -> Iterator[int]:
+    """Yield the masks for `count` consecutive nonces, keying the HMAC once (for simulations)."""
+    keyed = hmac.new(server_seed.encode(), digestmod=hashlib.sha256)
+    for nonce in range(start_nonce, start_nonce + count):
+        yield _mask(keyed, client_seed, nonce, mines)
+
+def verify_layout(server_seed: str, server_seed_hash: str, client_seed: str, nonce: int, mines: int) -> Optional[int]:
+    """Layout of a finished game, or None if the revealed seed doesn't match its committed hash."""
+    if not hmac.compare_digest(hash_server_seed(server_seed), server_seed_hash.lower()):
+        return None
+    return mine_mask(server_seed, client_seed, nonce, mines)
+
 class MinesGame:
-    def __init__(self, bet_amount: int, mines: int, player_emoji: str = "💎"):
+    def __init__(
+        self,
+        bet_amount: int,
+        mines: int,
+        player_emoji: str = "💎",
+        server_seed: Optional[str] = None,
+        client_seed: str = "",
+        nonce: int = 0
+    ):
         self.bet_amount = bet_amount
         self.mines_count = mines
         self.player_emoji = player_emoji
         self.current_multiplier = 1.0
         self.message_id = None
-        self.board = [[Tile(value=self.player_emoji) for _ in range(5)] for _ in range(5)]
+        self.board = [[Tile(value=self.player_emoji) for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
         self.gems_revealed = 0
         self.game_over = False
+        self.reveals: List[int] = []  # tile positions (row * 5 + col) in tap order
+        # Provably fair inputs; the board is derived from these, never stored
+        self.server_seed = server_seed or new_server_seed()
+        self.server_seed_hash = hash_server_seed(self.server_seed)
+        self.client_seed = client_seed
+        self.nonce = nonce
+        self.mine_mask = 0
         self.generate_board()
 
     def generate_board(self):
-        import random
-        positions = [(i,j) for i in range(5) for j in range(5)]
-        random.shuffle(positions)
-        
-        # Set mines
-        for i in range(self.mines_count):
-            row, col = positions[i]
-            self.board[row][col].value = "💣"
-            
+        self.mine_mask = mine_mask(self.server_seed, self.client_seed, self.nonce, self.mines_count)
+        for pos in range(TILE_COUNT):
+            if self.mine_mask >> pos & 1:
+                self.board[pos // BOARD_SIZE][pos % BOARD_SIZE].value = "💣"
         # Remaining tiles stay as player_emoji
 
     def reveal_tile(self, row: int, col: int) -> Tuple[bool, str]:
@@ -38,6 +99,7 @@ class MinesGame:
         if tile.revealed:
             return False, 'already_revealed'
         tile.revealed = True
+        self.reveals.append(row * BOARD_SIZE + col)
 
         if tile.value == "💣":
             self.game_over = True
@@ -56,4 +118,51 @@ class MinesGame:
     def _reveal_all_tiles(self):
         for row in self.board:
             for tile in row:
-                tile.revealed = True  
+                tile.revealed = True
+
+    def revealed_mask(self) -> int:
+        mask = 0
+        for i in range(BOARD_SIZE):
+            for j in range(BOARD_SIZE):
+                if self.board[i][j].revealed:
+                    mask |= 1 << (i * BOARD_SIZE + j)
+        return mask
+
+    def fairness_text(self) -> str:
+        """Seed reveal shown when the game ends."""
+        return (
+            f"Server seed: {self.server_seed}\n"
+            f"Client seed: {self.client_seed or '-'} | Nonce: {self.nonce}\n"
+            f"Verify: /verify {self.server_seed} {self.server_seed_hash} {self.nonce} {self.mines_count} {self.client_seed}"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact session state: seeds and reveal mask instead of the board."""
+        return {
+            "b": self.bet_amount,
+            "m": self.mines_count,
+            "e": self.player_emoji,
+            "s": self.server_seed,
+            "c": self.client_seed,
+            "n": self.nonce,
+            "r": self.revealed_mask(),
+            "v": self.reveals,
+            "o": self.game_over,
+            "id": self.message_id,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "MinesGame":
+        """Rebuild a live game by re-deriving the board and replaying reveals."""
+        game = cls(state["b"], state["m"], state["e"], state["s"], state["c"], state["n"])
+        game.message_id = state.get("id")
+        revealed = state.get("r", 0)
+        game.reveals = list(state.get("v", []))
+        for pos in range(TILE_COUNT):
+            if revealed >> pos & 1:
+                game.board[pos // BOARD_SIZE][pos % BOARD_SIZE].revealed = True
+                if not game.mine_mask >> pos & 1:
+                    game.gems_revealed += 1
+        game._recalculate_multiplier()
+        game.game_over = state.get("o", False)
+        return game
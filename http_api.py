@@ -0,0 +1,158 @@
+"""Read-only local HTTP API for dashboards.
+
+Serves GET /users/<id>, /leaderboard?limit=N, /stats and /metrics from the
+live bot state. The Flask app runs on a daemon thread; every read of bot
+state is handed to the bot's event loop, so handlers and the API never
+touch the store concurrently. Serialized JSON bodies are cached per URL and
+reused until UserDatabase.version changes; the ETag is a digest of the body,
+so unchanged resources still answer If-None-Match with 304 after a version bump.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from flask import Flask, Response, abort, request
+from werkzeug.serving import make_server
+
+from database import UserDatabase
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_RESPONSES = 1024
+MAX_LEADERBOARD_LIMIT = 100
+READ_TIMEOUT = 5.0
+
+_server = None
+_thread: Optional[threading.Thread] = None
+
+
+class ResponseCache:
+    """URL -> (store version, etag, body), LRU-bounded and thread-safe."""
+
+    def __init__(self, max_size: int = MAX_CACHED_RESPONSES):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[int, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: int) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: str, version: int, body: bytes) -> str:
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        with self._lock:
+            self._entries[key] = (version, etag, body)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return etag
+
+
+def create_app(
+    db: UserDatabase,
+    loop: asyncio.AbstractEventLoop,
+    live_stats: Callable[[], Dict[str, Any]],
+    render_metrics: Optional[Callable[[], str]] = None
+) -> Flask:
+    app = Flask(__name__)
+    cache = ResponseCache()
+    app.config["response_cache"] = cache
+
+    def on_loop(fn: Callable[[], Any]) -> Any:
+        """Run fn on the bot's event loop and wait for its result."""
+        async def call():
+            return fn()
+        return asyncio.run_coroutine_threadsafe(call(), loop).result(READ_TIMEOUT)
+
+    def cached_json(build: Callable[[], Any]) -> Response:
+        key = request.full_path
+        version = db.version
+        hit = cache.get(key, version)
+        if hit is None:
+            payload = on_loop(build)
+            if payload is None:
+                abort(404)
+            body = json.dumps(payload, ensure_ascii=False).encode()
+            etag = cache.put(key, version, body)
+        else:
+            etag, body = hit
+
+        if etag in request.headers.get("If-None-Match", ""):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="application/json")
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    @app.get("/users/<int:user_id>")
+    def user(user_id: int):
+        def build():
+            record = db.get_user_record(user_id)
+            if record is None:
+                return None
+            return {
+                "user_id": user_id,
+                "username": record.get("username", ""),
+                "first_name": record.get("first_name", ""),
+                "balance": record.get("balance", 0),
+                "selected_emoji": record.get("selected_emoji", ""),
+                "emojis": list(record.get("emojis", [])),
+                "stats": dict(record.get("stats", {})),
+            }
+        return cached_json(build)
+
+    @app.get("/leaderboard")
+    def leaderboard():
+        limit = max(1, min(request.args.get("limit", 10, type=int), MAX_LEADERBOARD_LIMIT))
+        return cached_json(lambda: [
+            {"rank": rank, "user_id": uid, "username": username, "first_name": first_name, "balance": balance}
+            for rank, (uid, username, first_name, balance) in enumerate(db.get_top_users(limit), start=1)
+        ])
+
+    @app.get("/stats")
+    def stats():
+        return cached_json(live_stats)
+
+    if render_metrics is not None:
+        @app.get("/metrics")
+        def metrics():
+            # Counters move without store writes; always rendered fresh
+            return Response(on_loop(render_metrics), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+
+def start(db: UserDatabase, host: str, port: int, live_stats: Callable[[], Dict[str, Any]],
+          render_metrics: Optional[Callable[[], str]] = None) -> None:
+    """Serve the API on a daemon thread; once per process, no-op if port is 0."""
+    global _server, _thread
+    if not port or _server is not None:
+        return
+    app = create_app(db, asyncio.get_running_loop(), live_stats, render_metrics)
+    # Dashboards poll often; per-request access logs would flood the bot log
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    _server = make_server(host, port, app, threaded=True)
+    _thread = threading.Thread(target=_server.serve_forever, name="http-api", daemon=True)
+    _thread.start()
+    logger.info(f"HTTP API listening on http://{host}:{port}")
+
+
+def stop() -> None:
+    global _server, _thread
+    if _server is not None:
+        _server.shutdown()
+        _server = None
+        _thread = None
@@ -0,0 +1,44 @@
+"""Server-side caches for inline queries (@bot top, @bot balance).
+
+The global leaderboard is shared by everyone and cached for TOP_TTL seconds;
+balances are cached per user for BALANCE_TTL. The same lifetimes are sent
+as cache_time so Telegram also serves repeats without asking the bot.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+TOP_TTL = 30
+BALANCE_TTL = 10
+MAX_BALANCE_ENTRIES = 10000
+
+
+class TTLCache:
+    """Small LRU-bounded cache whose entries expire after a fixed TTL."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Any:
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl, value)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+top_cache = TTLCache(TOP_TTL, 1)
+balance_cache = TTLCache(BALANCE_TTL, MAX_BALANCE_ENTRIES)
@@ -0,0 +1,136 @@
+"""Per-chat leaderboards maintained incrementally from balance changes.
+
+Each chat keeps a bounded top-K map plus a threshold: an upper bound on the
+balance of every tracked member who is *not* in the map. Entries at or above
+the threshold are exact, so a query only falls back to rescanning that chat's
+members when too few exact entries remain.
+"""
+import heapq
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from database import UserDatabase
+
+TOP_K = 50
+MAX_CHAT_MEMBERS = 5000
+# Same cap as the "chats" list UserDatabase.record_chat keeps per user
+MAX_CHATS_PER_USER = 20
+
+
+class ChatTopK:
+    __slots__ = ("top", "threshold")
+
+    def __init__(self):
+        self.top: Dict[int, int] = {}
+        self.threshold = float("-inf")
+
+
+class ChatLeaderboards:
+    def __init__(self, db: UserDatabase, k: int = TOP_K, max_members: int = MAX_CHAT_MEMBERS,
+                 max_chats: int = MAX_CHATS_PER_USER):
+        self.db = db
+        self.k = k
+        self.max_members = max_members
+        self.max_chats = max_chats
+        self.members: Dict[int, "OrderedDict[int, None]"] = {}
+        self.boards: Dict[int, ChatTopK] = {}
+        # Oldest chat first, trimmed like the stored list
+        self.chats_of: Dict[int, "OrderedDict[int, None]"] = {}
+        self.rebuilds = 0
+
+        for user_id, record in db.iter_users():
+            for chat_id in record.get("chats", []):
+                self._track(chat_id, user_id, record.get("balance", 0))
+        db.add_balance_listener(self.on_balance_change)
+
+    def record_activity(self, chat_id: int, user_id: int) -> None:
+        """Mark a user active in a chat, persisting new memberships."""
+        members = self.members.get(chat_id)
+        if members is not None and user_id in members:
+            members.move_to_end(user_id)
+            return
+        if not self.db.user_exists(user_id):
+            return
+        self.db.record_chat(user_id, chat_id, limit=self.max_chats)
+        self._track(chat_id, user_id, self.db.get_balance(user_id))
+
+    def chat_members(self, chat_id: int) -> List[int]:
+        """Tracked members of a chat, least recently active first."""
+        return list(self.members.get(chat_id, ()))
+
+    def _track(self, chat_id: int, user_id: int, balance: int) -> None:
+        members = self.members.setdefault(chat_id, OrderedDict())
+        board = self.boards.setdefault(chat_id, ChatTopK())
+        if user_id in members:
+            members.move_to_end(user_id)
+        else:
+            members[user_id] = None
+            chats = self.chats_of.setdefault(user_id, OrderedDict())
+            chats[chat_id] = None
+            if len(chats) > self.max_chats:
+                dropped = next(iter(chats))
+                self._untrack(dropped, user_id)
+            if len(members) > self.max_members:
+                self._untrack(chat_id, next(iter(members)))
+        self._offer(board, user_id, balance)
+
+    def _untrack(self, chat_id: int, user_id: int) -> None:
+        """Forget one membership on both sides."""
+        members = self.members.get(chat_id)
+        if members is not None:
+            members.pop(user_id, None)
+        board = self.boards.get(chat_id)
+        if board is not None:
+            board.top.pop(user_id, None)
+        chats = self.chats_of.get(user_id)
+        if chats is not None:
+            chats.pop(chat_id, None)
+            if not chats:
+                del self.chats_of[user_id]
+
+    def _offer(self, board: ChatTopK, user_id: int, balance: int) -> None:
+        if user_id in board.top:
+            board.top[user_id] = balance
+        elif balance > board.threshold:
+            board.top[user_id] = balance
+            if len(board.top) > self.k:
+                loser = min(board.top, key=board.top.__getitem__)
+                board.threshold = max(board.threshold, board.top.pop(loser))
+
+    def on_balance_change(self, user_id: int, old: int, new: int, reason: str = "") -> None:
+        for chat_id in self.chats_of.get(user_id, ()):
+            self._offer(self.boards[chat_id], user_id, new)
+
+    def _rebuild(self, chat_id: int) -> None:
+        """Recompute one chat's top-K from its members only."""
+        self.rebuilds += 1
+        board = self.boards[chat_id]
+        balances = []
+        for user_id in self.members.get(chat_id, ()):
+            record = self.db.get_user_record(user_id)
+            if record is not None:
+                balances.append((record.get("balance", 0), user_id))
+        best = heapq.nlargest(self.k + 1, balances)
+        board.top = {uid: bal for bal, uid in best[:self.k]}
+        board.threshold = best[self.k][0] if len(best) > self.k else float("-inf")
+
+    def top(self, chat_id: int, limit: int = 10) -> List[Tuple[int, int]]:
+        """Top (user_id, balance) pairs for a chat."""
+        board = self.boards.get(chat_id)
+        if board is None:
+            return []
+        wanted = min(limit, len(self.members.get(chat_id, ())))
+        ranked = sorted(board.top.items(), key=lambda x: x[1], reverse=True)
+        exact = sum(1 for _, bal in ranked[:wanted] if bal >= board.threshold)
+        if exact < wanted:
+            self._rebuild(chat_id)
+            ranked = sorted(board.top.items(), key=lambda x: x[1], reverse=True)
+        return ranked[:limit]
+
+    def top_users(self, chat_id: int, limit: int = 10) -> List[Tuple[int, str, str, int]]:
+        """Same shape as UserDatabase.get_top_users, scoped to one chat."""
+        result = []
+        for user_id, balance in self.top(chat_id, limit):
+            record = self.db.get_user_record(user_id) or {}
+            result.append((user_id, record.get("username", ""), record.get("first_name", "Unknown"), balance))
+        return result
@@ -0,0 +1,272 @@
+"""Offline load generator that drives the real handlers through Application.process_update.
+
+Synthetic players run /start, /mine, bursts of tile taps, /cashout, /gift and
+/leaderboard against a fake bot that records API calls and simulates network
+latency. Storage goes to a throwaway directory.
+
+    python loadtest.py --players 500 --chats 20 --games 3 --tap-rate 4 --latency-ms 40
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_fake_bot_class():
+    from telegram.ext import ExtBot
+
+    class FakeBot(ExtBot):
+        """ExtBot that answers every API call locally after a simulated delay."""
+
+        def __init__(self, latency: float, jitter: float, **kwargs):
+            super().__init__(token="123456:LOADTEST", **kwargs)
+            with self._unfrozen():
+                self.latency = latency
+                self.jitter = jitter
+                self.api_calls: Counter = Counter()
+                self._message_ids = itertools.count(1_000_000)
+
+        async def _post(self, endpoint: str, data: Optional[Dict[str, Any]] = None, *args, **kwargs) -> Any:
+            self.api_calls[endpoint] += 1
+            if self.latency:
+                await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+            if endpoint == "getMe":
+                return {"id": 1, "is_bot": True, "first_name": "Mines", "username": "mines_loadtest_bot"}
+            if endpoint == "sendMessage":
+                return {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": data["chat_id"], "type": "group" if data["chat_id"] < 0 else "private"},
+                    "text": data.get("text", ""),
+                }
+            return True
+
+    return FakeBot
+
+
+class LoadGenerator:
+    """Builds synthetic updates and pushes them through an Application."""
+
+    def __init__(self, application, bot, args: argparse.Namespace):
+        import main as bot_main
+
+        self.app = application
+        self.bot = bot
+        self.main = bot_main
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.update_ids = itertools.count(1)
+        self.latencies: List[float] = []
+        self.by_kind: Dict[str, List[float]] = {}
+        self.games_started = 0
+        self.saves = 0
+
+        original_save = bot_main.db._save_data
+
+        def counting_save() -> None:
+            if not bot_main.db._batch_depth:
+                self.saves += 1
+            original_save()
+
+        bot_main.db._save_data = counting_save
+
+    def _user(self, uid: int) -> Dict[str, Any]:
+        return {"id": uid, "is_bot": False, "first_name": f"Player{uid}", "username": f"p{uid}"}
+
+    def _chat(self, chat_id: int) -> Dict[str, Any]:
+        return {"id": chat_id, "type": "group", "title": f"Load {chat_id}"}
+
+    async def _dispatch(self, kind: str, payload: Dict[str, Any]) -> None:
+        from telegram import Update
+
+        update = Update.de_json({"update_id": next(self.update_ids), **payload}, self.bot)
+        started = time.perf_counter()
+        await self.app.process_update(update)
+        elapsed = time.perf_counter() - started
+        self.latencies.append(elapsed)
+        self.by_kind.setdefault(kind, []).append(elapsed)
+
+    async def command(self, uid: int, chat_id: int, text: str) -> None:
+        command = text.split()[0]
+        await self._dispatch(command, {"message": {
+            "message_id": next(self.update_ids),
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+            "from": self._user(uid),
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        }})
+
+    async def callback(self, uid: int, chat_id: int, message_id: int, data: str) -> None:
+        await self._dispatch(data.split("_", 1)[0], {"callback_query": {
+            "id": str(next(self.update_ids)),
+            "from": self._user(uid),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": message_id or 1,
+                "date": int(time.time()),
+                "chat": self._chat(chat_id),
+                "text": "board",
+            },
+        }})
+
+    async def _pause(self) -> None:
+        await asyncio.sleep(self.rng.expovariate(self.args.tap_rate))
+
+    async def player(self, uid: int, chat_id: int) -> None:
+        args = self.args
+        await self.command(uid, chat_id, "/start")
+
+        for _ in range(args.games):
+            await self.command(uid, chat_id, f"/mine {args.bet} {self.rng.randint(3, 8)}")
+            game = self.main.user_games.get(chat_id, {}).get(uid)
+            if not game:
+                continue
+            self.games_started += 1
+
+            hidden = [(i, j) for i in range(5) for j in range(5)]
+            self.rng.shuffle(hidden)
+            for row, col in hidden[:self.rng.randint(1, 6)]:
+                await self._pause()
+                await self.callback(uid, chat_id, game.message_id, f"reveal_{row}_{col}_{uid}")
+                if self.rng.random() < args.double_tap:
+                    await self.callback(uid, chat_id, game.message_id, f"reveal_{row}_{col}_{uid}")
+                if uid not in self.main.user_games.get(chat_id, {}):
+                    break
+
+            if uid in self.main.user_games.get(chat_id, {}):
+                await self._pause()
+                await self.command(uid, chat_id, "/cashout" if game.gems_revealed >= 2 else "/end")
+
+            if self.rng.random() < args.gift_rate:
+                other = self.rng.randrange(args.players) + 1
+                if other != uid:
+                    await self.command(uid, chat_id, f"/gift @p{other} 1")
+            if self.rng.random() < args.leaderboard_rate:
+                await self.command(uid, chat_id, "/leaderboard")
+
+    async def run(self) -> Dict[str, Any]:
+        args = self.args
+        chats = [-(1000 + i) for i in range(args.chats)]
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self.player(uid, chats[uid % len(chats)]) for uid in range(1, args.players + 1)
+        ))
+        wall = time.perf_counter() - started
+        updates = len(self.latencies)
+        return {
+            "updates": updates,
+            "wall_seconds": wall,
+            "throughput": updates / wall if wall else 0.0,
+            "p50_ms": percentile(self.latencies, 50) * 1000,
+            "p95_ms": percentile(self.latencies, 95) * 1000,
+            "p99_ms": percentile(self.latencies, 99) * 1000,
+            "games": self.games_started,
+            "saves": self.saves,
+            "saves_per_game": self.saves / self.games_started if self.games_started else 0.0,
+            "api_calls": sum(self.bot.api_calls.values()),
+            "api_calls_per_update": sum(self.bot.api_calls.values()) / updates if updates else 0.0,
+            "api_by_method": dict(self.bot.api_calls.most_common()),
+            "by_kind_p95_ms": {k: percentile(v, 95) * 1000 for k, v in sorted(self.by_kind.items())},
+            "by_kind_mean_ms": {k: statistics.fmean(v) * 1000 for k, v in sorted(self.by_kind.items())},
+        }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Updates:        {report['updates']} in {report['wall_seconds']:.2f}s "
+          f"({report['throughput']:.0f} updates/s)")
+    print(f"Latency:        p50 {report['p50_ms']:.2f} ms | p95 {report['p95_ms']:.2f} ms | "
+          f"p99 {report['p99_ms']:.2f} ms")
+    print(f"Games:          {report['games']} | storage writes {report['saves']} "
+          f"({report['saves_per_game']:.2f} per game)")
+    print(f"API calls:      {report['api_calls']} ({report['api_calls_per_update']:.2f} per update)")
+    for method, count in report["api_by_method"].items():
+        print(f"  {method:<22}{count}")
+    print(f"Outbox pending: {report.get('outbox_pending', 0)}")
+    suppressed = report.get("callbacks_suppressed") or {}
+    print(f"Callbacks dropped: {sum(suppressed.values())} "
+          f"({', '.join(f'{k} {v}' for k, v in sorted(suppressed.items())) or 'none'})")
+    print("Per update kind (mean / p95 ms):")
+    for kind, p95 in report["by_kind_p95_ms"].items():
+        print(f"  {kind:<22}{report['by_kind_mean_ms'][kind]:.2f} / {p95:.2f}")
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    # Storage must point at a scratch directory before the bot modules load
+    os.environ["PERSISTENT_STORAGE_PATH"] = args.data_dir or tempfile.mkdtemp(prefix="mines-load-")
+
+    import config
+    import main as bot_main
+    from telegram.ext import Application
+
+    if not args.rate_limit:
+        config.RATE_LIMIT_USER = config.RATE_LIMIT_CHAT = (10 ** 9, 10 ** 9)
+        config.RATE_LIMIT_FAMILY = {}
+
+    # Per-update INFO logging would dominate the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+
+    bot = make_fake_bot_class()(args.latency_ms / 1000, args.jitter_ms / 1000)
+    application = Application.builder().bot(bot).updater(None).build()
+    bot_main.register_handlers(application)
+
+    await application.initialize()
+    await bot_main.start_background_tasks(application)
+    await application.start()
+    try:
+        report = await LoadGenerator(application, bot, args).run()
+        # Let queued notifications drain so their API calls are counted
+        outbox = application.bot_data["outbox"]
+        deadline = time.perf_counter() + args.drain_seconds
+        while outbox.pending and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        report["outbox_pending"] = len(outbox.pending)
+        report["api_calls"] = sum(bot.api_calls.values())
+        report["api_calls_per_update"] = report["api_calls"] / report["updates"] if report["updates"] else 0.0
+        report["api_by_method"] = dict(bot.api_calls.most_common())
+        report["callbacks_suppressed"] = dict(bot_main.callback_guard.guard.suppressed)
+        return report
+    finally:
+        await application.stop()
+        await bot_main.stop_background_tasks(application)
+        await application.shutdown()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Synthetic load test for the Mines bot")
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--games", type=int, default=3, help="Games per player")
+    parser.add_argument("--bet", type=int, default=10)
+    parser.add_argument("--tap-rate", type=float, default=4.0, help="Mean taps per second per player")
+    parser.add_argument("--double-tap", type=float, default=0.05, help="Chance a tap is delivered twice")
+    parser.add_argument("--gift-rate", type=float, default=0.1)
+    parser.add_argument("--leaderboard-rate", type=float, default=0.1)
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Simulated Bot API latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--drain-seconds", type=float, default=30.0, help="Max wait for the outbox to empty")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the production rate limits on")
+    parser.add_argument("--data-dir", help="Storage directory (default: fresh temp dir)")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+if __name__ == "__main__":
+    print_report(asyncio.run(run_load(build_parser().parse_args())))
@@ -1,35 +1,64 @@
 import logging
 from telegram.constants import ParseMode
 import html
+from telegram.error import BadRequest, Forbidden
 from telegram import MessageEntity, User
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram import InlineQueryResultArticle, InputTextMessageContent
 import random
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
+    InlineQueryHandler,
     MessageHandler,
+    TypeHandler,
     filters
 )
-from game_logic import MinesGame
+from game_logic import MinesGame, verify_layout
+from game_archive import GameArchive, format_report
+import tournament as tournament_mode
 from database import UserDatabase
+from leaderboards import ChatLeaderboards
+from economy import Economy
 db = UserDatabase("users.json")
+chat_boards = ChatLeaderboards(db)
+economy = Economy(db)
+archive = GameArchive()
 import config
+import bulk_ops
+import callback_guard
+import catchup
+import outbox
+import inline_mode
+import memory_usage
+import metrics
+import profiling
+import rate_limit
+import user_sync
+import asyncio
 import datetime
-from typing import Dict
-def sync_user_info(user: User):
+import signal
+from typing import Dict, List, Tuple
+def sync_user_info(user: User, bot_id: int):
+    current_username = user.username or ""
+    current_first_name = user.first_name
+    key = (bot_id, user.id)
+    if user_sync.cache.unchanged(key, current_username, current_first_name):
+        return
+
     user_id = str(user.id)
     if not db.user_exists(user.id):
-        db.add_user(user.id, user.username, user.first_name)
+        db.add_user(user.id, user.username, user.first_name, bot_id=bot_id)
+        user_sync.cache.remember(key, current_username, current_first_name)
         return
 
+    db.record_bot(user.id, bot_id, config.PRIMARY_BOT_ID)
+
     stored = db.data["users"][user_id]
     updated = False
 
-    current_username = user.username or ""
-    current_first_name = user.first_name
-
     if stored.get("username", "") != current_username:
         stored["username"] = current_username
         updated = True
@@ -39,7 +68,10 @@ def sync_user_info(user: User):
         updated = True
 
     if updated:
-        db._save_data()
+        # Name changes ride along with the next write
+        user_sync.cache.name_changes += 1
+        db.mark_dirty()
+    user_sync.cache.remember(key, current_username, current_first_name)
 
 # Set up logging
 logging.basicConfig(
@@ -62,7 +94,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             user.id,
             user.username,     # may be None if they have no @username
             user.first_name,   # always present
-            100
+            100,
+            bot_id=context.bot.id
                 )
         await update.message.reply_text(
             f"Welcome to Mines Game, {user.first_name}!\n"
@@ -76,16 +109,23 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             "Use /help to see available commands."
         )
 
+def track_chat_activity(update: Update) -> None:
+    """Record the sender as an active member of the current group."""
+    chat = update.effective_chat
+    if chat and chat.type != "private" and update.effective_user:
+        chat_boards.record_activity(chat.id, update.effective_user.id)
+
 async def auto_sync_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if update.effective_user:
-        sync_user_info(update.effective_user)
+        sync_user_info(update.effective_user, context.bot.id)
+        track_chat_activity(update)
         
 async def track_groups(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Track when the bot is added to groups"""
     if update.message and update.message.new_chat_members:
         if context.bot.id in [u.id for u in update.message.new_chat_members]:
             group_id = update.message.chat_id
-            db.add_group(group_id)
+            db.add_group(group_id, context.bot.id)
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /help is issued."""
@@ -101,12 +141,18 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 /daily - Claim daily bonus (24h cooldown)
 /weekly - Claim weekly bonus (7d cooldown)
 /leaderboard - Show top players
-/gift @username <amount> - Send Hiwa to another player
+/stats - Show your game statistics
+/gift @user1 [@user2 ...] <amount> - Send Hiwa to one or more players
+/tournament <fee> <mines> <minutes> - Start a group tournament
+/tournament join - Enter the running tournament
 
 *New Features:*
 /store - View and buy emojis
 /collection - View your owned emojis
 /give [emoji] - Gift an emoji (reply to user)
+/clientseed <text> - Set the client seed for provably fair boards
+/verify <server seed> <seed hash> <nonce> <mines> <client seed> - Check a finished board
+Type @botname top or @botname balance in any chat to share without a command
 
 *Game Rules:*
 1. 5x5 grid with hidden gems (💎) and bombs (💣)
@@ -119,6 +165,12 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 /broadcast <message> - Send message to all users
 /resetdata - Reset all user data (admin only)
 /setbalance @user <amount> - Set user balance (admin only)
+/airdrop <amount> - Credit every tracked member of this group (admin only)
+/archive <rtp|busts|top> [hours] - Query finished games (admin only)
+/economy - Money supply, bonuses and house profit (admin only)
+/bulk <set|add|multiply|cap> <value> [min=N] [max=N] [inactive=DAYS] [emoji=X] [dry] - Bulk balance change (admin only)
+/memory [snap|stop] - Memory usage and tracemalloc diffs (admin only)
+/profile <sample|cprofile> <N> [updates|seconds] - Profile handlers (admin only)
 """
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
@@ -206,10 +258,13 @@ async def start_game(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         selected_emoji = db.get_selected_emoji(user_id)
 
         # Deduct balance and initialize game
-        db.deduct_balance(user_id, amount)
-        game = MinesGame(amount, mines, selected_emoji)
+        with db.batch():
+            db.deduct_balance(user_id, amount, reason="bet")
+            nonce = db.next_nonce(user_id)
+        game = MinesGame(amount, mines, selected_emoji, client_seed=db.get_client_seed(user_id), nonce=nonce)
 
         # Store game under chat_id and user_id
+        track_chat_activity(update)
         if chat_id not in user_games:
             user_games[chat_id] = {}
         user_games[chat_id][user_id] = game
@@ -248,6 +303,7 @@ async def send_initial_board(
         f"💎 {update.effective_user.first_name}'s Mines Game Started! 💣\n"
         f"Bet: {game.bet_amount} Hiwa\n"
         f"Mines: {game.mines_count}\n"
+        f"Seed hash: {game.server_seed_hash}\n"
         f"Tap tiles to begin!"
     )
     
@@ -321,7 +377,7 @@ async def button_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # Calculate and award winnings
         win_amount = int(game.bet_amount * game.current_multiplier)
-        db.add_balance(user_id, win_amount)
+        db.add_balance(user_id, win_amount, reason="payout")
 
         # Finish the game
         await handle_game_over(
@@ -417,6 +473,10 @@ async def handle_game_over(
     context: ContextTypes.DEFAULT_TYPE = None
 ) -> None:
     """Handle game conclusion with group chat support"""
+    # Archive before the board is revealed below
+    win_amount = int(game.bet_amount * game.current_multiplier) if won else 0
+    archive.append(user_id, chat_id, game, win_amount, "win" if won else "bust")
+
     # 1. Mark exploded bomb if applicable
     if not won and 0 <= exploded_row < 5 and 0 <= exploded_col < 5:
         game.board[exploded_row][exploded_col].value = "💥"
@@ -442,9 +502,12 @@ async def handle_game_over(
         keyboard.append([InlineKeyboardButton("🎮 Play Again", callback_data=f"newgame_{user_id}")])
 
     # 5. Prepare result message
+    db.record_game_result(
+        user_id, game.mines_count, game.bet_amount, win_amount,
+        game.current_multiplier, "win" if won else "bust"
+    )
     balance = db.get_balance(user_id)
     if won:
-        win_amount = int(game.bet_amount * game.current_multiplier)
         message = (
             f"🎉 {update.effective_user.first_name} Cashed Out!\n"
             f"Won: {win_amount} Hiwa\n"
@@ -456,6 +519,7 @@ async def handle_game_over(
             f"Lost: {game.bet_amount} Hiwa\n"
             f"New Balance: {balance} Hiwa"
         )
+    message += f"\n\n{game.fairness_text()}"
 
     # 6. Edit original message
     try:
@@ -466,7 +530,8 @@ async def handle_game_over(
     except Exception as e:
         logger.error(f"Game over error: {e}")
 
-    # 7. Cleanup game state
+    # 7. Cleanup game state; later taps on this board are answered by the guard
+    callback_guard.guard.bury(chat_id, game.message_id)
     try:
         del user_games[chat_id][user_id]
         if not user_games[chat_id]:
@@ -515,7 +580,7 @@ async def buy_emoji(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text(f"❌ You need {item['price']} Hiwa to buy this!")
         return
         
-    db.deduct_balance(user.id, item['price'])
+    db.deduct_balance(user.id, item['price'], reason="store")
     db.add_emoji(user.id, emoji)
     await update.message.reply_text(
         f"✅ Successfully purchased {emoji}!\n"
@@ -540,6 +605,44 @@ async def set_emoji(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     db.set_selected_emoji(user.id, emoji)
     await update.message.reply_text(f"✅ Game emoji set to {emoji}!")
 
+async def client_seed_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /clientseed — show or change the client seed mixed into your boards."""
+    user_id = update.effective_user.id
+    if not context.args:
+        await update.message.reply_text(
+            f"Your client seed: {db.get_client_seed(user_id)}\n"
+            "Use /clientseed <text> to change it."
+        )
+        return
+
+    client_seed = " ".join(context.args)[:64]
+    db.set_client_seed(user_id, client_seed)
+    await update.message.reply_text(f"✅ Client seed set to {client_seed}")
+
+async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /verify — recompute a finished board from its revealed seeds."""
+    args = context.args or []
+    try:
+        server_seed, seed_hash, nonce, mines = args[0], args[1], int(args[2]), int(args[3])
+        client_seed = " ".join(args[4:])
+        if nonce < 0 or not 1 <= mines <= 24 or not client_seed:
+            raise ValueError
+    except (IndexError, ValueError):
+        await update.message.reply_text(
+            "Usage: /verify <server seed> <seed hash> <nonce> <mines> <client seed>\n"
+            "All values are shown when a game ends."
+        )
+        return
+
+    mask = verify_layout(server_seed, seed_hash, client_seed, nonce, mines)
+    if mask is None:
+        await update.message.reply_text("❌ That server seed does not match the seed hash.")
+        return
+    grid = "\n".join(
+        "".join("💣" if mask >> (i * 5 + j) & 1 else "💎" for j in range(5)) for i in range(5)
+    )
+    await update.message.reply_text(f"✅ Seed matches its hash. The board was:\n{grid}")
+
 # Collection command
 async def collection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show user's emoji collection"""
@@ -581,10 +684,7 @@ async def emoji_gift(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     db.add_emoji(target.id, emoji)
 
     await update.message.reply_text(f"✅ You gifted {emoji} to {target.first_name}!")
-    await context.bot.send_message(
-        chat_id=target.id,
-        text=f"🎁 You received {emoji} from {user.first_name}!"
-    )
+    notify(context, [(target.id, f"🎁 You received {emoji} from {user.first_name}!")])
 
 async def cashout_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /cashout command with group-chat support."""
@@ -604,7 +704,7 @@ async def cashout_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Perform cashout
     game.game_over = True
     win_amount = int(game.bet_amount * game.current_multiplier)
-    db.add_balance(user_id, win_amount)
+    db.add_balance(user_id, win_amount, reason="payout")
     # Reuse your existing handle_game_over
     await handle_game_over(update, chat_id, user_id, game, won=True, context=context)
 
@@ -626,10 +726,14 @@ async def end_game(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     # Refund original bet
-    db.add_balance(user_id, game.bet_amount)
+    with db.batch():
+        db.add_balance(user_id, game.bet_amount, reason="refund")
+        db.record_game_result(user_id, game.mines_count, game.bet_amount, 0, 1.0, "cancel")
+    archive.append(user_id, chat_id, game, game.bet_amount, "cancel")
     new_balance = db.get_balance(user_id)
 
     # Clean up state exactly as in handle_game_over
+    callback_guard.guard.bury(chat_id, game.message_id)
     del user_games[chat_id][user_id]
     if not user_games[chat_id]:
         del user_games[chat_id]
@@ -637,7 +741,8 @@ async def end_game(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     # Let the user know
     await update.message.reply_text(
         f"🛑 Game cancelled. Your bet of {game.bet_amount} Hiwa has been refunded.\n"
-        f"Current balance: {new_balance} Hiwa"
+        f"Current balance: {new_balance} Hiwa\n\n"
+        f"{game.fairness_text()}"
     )
 
 async def daily_bonus(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -654,7 +759,7 @@ async def daily_bonus(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         return
     
     amount = 50  # Daily bonus amount
-    db.add_balance(user_id, amount)
+    db.add_balance(user_id, amount, reason="daily")
     db.set_last_daily(user_id, datetime.datetime.now())
     await update.message.reply_text(
         f"🎁 You claimed your daily bonus of {amount} Hiwa!\n"
@@ -675,34 +780,73 @@ async def weekly_bonus(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         return
     
     amount = 200  # Weekly bonus amount
-    db.add_balance(user_id, amount)
+    db.add_balance(user_id, amount, reason="weekly")
     db.set_last_weekly(user_id, datetime.datetime.now())
     await update.message.reply_text(
         f"🎁 You claimed your weekly bonus of {amount} Hiwa!\n"
         f"New balance: {db.get_balance(user_id)} Hiwa"
     )
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /stats — your game counters plus global return-to-player by mines count."""
+    user = update.effective_user
+    stats = db.get_user_stats(user.id)
+
+    if stats and stats.get("games"):
+        win_rate = stats["wins"] / stats["games"] * 100
+        net = stats["won"] - stats["wagered"]
+        lines = [
+            f"📊 {user.first_name}'s Stats\n",
+            f"Games: {stats['games']} | Wins: {stats['wins']} | Busts: {stats['busts']}",
+            f"Win rate: {win_rate:.1f}%",
+            f"Wagered: {stats['wagered']:,} Hiwa | Won: {stats['won']:,} Hiwa | Net: {net:+,} Hiwa",
+            f"Best multiplier: {stats['best_multiplier']:.2f}x",
+            f"Current streak: {stats['streak']} | Longest streak: {stats['longest_streak']}",
+        ]
+    else:
+        lines = ["📊 You haven't finished any games yet. Try /mine!"]
+
+    totals = db.get_game_stats()
+    if totals:
+        lines.append("\n🌍 Global by mines (games / win rate / RTP):")
+        for mines in sorted(totals):
+            t = totals[mines]
+            if not t["games"]:
+                continue
+            rtp = t["paid_out"] / t["wagered"] * 100 if t["wagered"] else 0.0
+            lines.append(f"{mines} 💣: {t['games']} / {t['wins'] / t['games'] * 100:.1f}% / {rtp:.1f}%")
+
+    await update.message.reply_text("\n".join(lines))
+
+def format_leaderboard(title: str, top) -> str:
+    """HTML leaderboard text from get_top_users-shaped rows."""
+    lines = [title]  # Title with spacing
+
+    medals = ["🥇", "🥈", "🥉"]
+
+    for i, (uid, username, first_name, balance) in enumerate(top, start=1):
+        prefix = medals[i - 1] if i <= 3 else f"{i}."
+        safe_name = html.escape(first_name or "Unknown")
+        mention = f'<a href="tg://user?id={uid}">{safe_name}</a>'
+        lines.append(f"{prefix} {mention} — <b>{balance:,}</b> Hiwa\n")  # <- Extra \n here
+
+    return "\n".join(lines)
+
 async def leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
-        top = db.get_top_users(10)
+        chat = update.effective_chat
+        if chat.type != "private":
+            top = chat_boards.top_users(chat.id, 10)
+            title = "<b>🏆 TOP PLAYERS IN THIS GROUP 🏆</b>\n"
+        else:
+            top = db.get_top_users(10)
+            title = "<b>🏆 TOP PLAYERS 🏆</b>\n"
         if not top:
             await update.message.reply_text("🏆 Leaderboard is empty!")
             return
 
-        lines = ["<b>🏆 TOP PLAYERS 🏆</b>\n"]  # Title with spacing
-
-        medals = ["🥇", "🥈", "🥉"]
-
-        for i, (uid, username, first_name, balance) in enumerate(top, start=1):
-            prefix = medals[i - 1] if i <= 3 else f"{i}."
-            safe_name = html.escape(first_name or "Unknown")
-            mention = f'<a href="tg://user?id={uid}">{safe_name}</a>'
-            lines.append(f"{prefix} {mention} — <b>{balance:,}</b> Hiwa\n")  # <- Extra \n here
-
-        message = "\n".join(lines)
-
         await update.message.reply_text(
-            message,
+            format_leaderboard(title, top),
             parse_mode=ParseMode.HTML,
             disable_web_page_preview=True
         )
@@ -711,17 +855,74 @@ async def leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         logger.error(f"Leaderboard error: {e}")
         await update.message.reply_text("❌ Failed to load leaderboard. Please try again!")
 
+def inline_top_result() -> InlineQueryResultArticle:
+    result = inline_mode.top_cache.get("top")
+    if result is None:
+        top = db.get_top_users(10)
+        text = format_leaderboard("<b>🏆 TOP PLAYERS 🏆</b>\n", top) if top else "🏆 Leaderboard is empty!"
+        leader = f"{top[0][2] or 'Unknown'} leads with {top[0][3]:,} Hiwa" if top else "No players yet"
+        result = InlineQueryResultArticle(
+            id="top",
+            title="🏆 Leaderboard",
+            description=leader,
+            input_message_content=InputTextMessageContent(
+                text, parse_mode=ParseMode.HTML, disable_web_page_preview=True
+            ),
+        )
+        inline_mode.top_cache.put("top", result)
+    return result
+
+def inline_balance_result(user: User) -> InlineQueryResultArticle:
+    result = inline_mode.balance_cache.get(user.id)
+    if result is None:
+        if db.user_exists(user.id):
+            balance = db.get_balance(user.id)
+            text = f"💰 {html.escape(user.first_name)} has <b>{balance:,}</b> Hiwa"
+            description = f"{balance:,} Hiwa"
+        else:
+            text = "I haven't played Mines yet."
+            description = "No account yet — send /start to the bot"
+        result = InlineQueryResultArticle(
+            id="balance",
+            title="💰 My balance",
+            description=description,
+            input_message_content=InputTextMessageContent(text, parse_mode=ParseMode.HTML),
+        )
+        inline_mode.balance_cache.put(user.id, result)
+    return result
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answer @bot top / @bot balance from the inline caches."""
+    query = update.inline_query
+    text = query.query.strip().lower()
+    results = []
+    if not text or "balance".startswith(text):
+        results.append(inline_balance_result(query.from_user))
+    if not text or "top".startswith(text) or "leaderboard".startswith(text):
+        results.append(inline_top_result())
+
+    if any(result.id == "balance" for result in results):
+        # Balances differ per user, so Telegram must not share them
+        await query.answer(results, cache_time=inline_mode.BALANCE_TTL, is_personal=True)
+    else:
+        await query.answer(results, cache_time=inline_mode.TOP_TTL)
+
+def notify(context: ContextTypes.DEFAULT_TYPE, messages) -> None:
+    """Queue (chat_id, text) side-effect notifications on the bot's outbox."""
+    context.application.bot_data["outbox"].put_many(list(messages))
+
 async def gift(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle /gift command."""
+    """Handle /gift @a [@b ...] <amount> — every recipient gets <amount>."""
+    usage = "Usage: /gift @username [@username ...] <amount>"
     if len(context.args) < 2:
-        await update.message.reply_text("Usage: /gift @username <amount>")
+        await update.message.reply_text(usage)
         return
 
     try:
-        recipient_username = context.args[0].lstrip('@')
-        amount = int(context.args[1])
+        recipient_usernames = [arg.lstrip('@') for arg in context.args[:-1]]
+        amount = int(context.args[-1])
     except (ValueError, IndexError):
-        await update.message.reply_text("Usage: /gift @username <amount>")
+        await update.message.reply_text(usage)
         return
 
     if amount < 1:
@@ -731,46 +932,336 @@ async def gift(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     sender = update.effective_user
     sender_id = sender.id
 
-    logger.info(f"GIFT CMD by {sender.username} -> @{recipient_username} | {amount} Hiwa")
+    logger.info(f"GIFT CMD by {sender.username} -> {recipient_usernames} | {amount} Hiwa each")
+
+    # Validate every recipient before touching any balance
+    recipients: Dict[int, str] = {}
+    for recipient_username in recipient_usernames:
+        recipient_id = db.get_user_id_by_username(recipient_username)
+        if not recipient_id:
+            logger.warning(f"User not found by username: {recipient_username}")
+            await update.message.reply_text(
+                f"❌ User '@{recipient_username}' not found. "
+                "Make sure they have started the bot and their username is visible."
+            )
+            return
+        if sender_id == recipient_id:
+            await update.message.reply_text("❌ You can't gift yourself!")
+            return
+        recipients[recipient_id] = recipient_username
 
-    recipient_id = db.get_user_id_by_username(recipient_username)
+    total = amount * len(recipients)
+    if not db.has_sufficient_balance(sender_id, total):
+        await update.message.reply_text("❌ Insufficient balance for this gift.")
+        return
 
-    if not recipient_id:
-        logger.warning(f"User not found by username: {recipient_username}")
+    # Transfer funds in one batch
+    changes = {recipient_id: amount for recipient_id in recipients}
+    changes[sender_id] = -total
+    try:
+        balances = db.apply_balance_changes(changes, reason="gift")
+    except ValueError as e:
+        logger.warning(f"Gift rejected: {e}")
+        await update.message.reply_text("❌ Insufficient balance for this gift.")
+        return
+
+    names = ", ".join(f"@{name}" for name in recipients.values())
+    each = " each" if len(recipients) > 1 else ""
+    await update.message.reply_text(
+        f"🎁 You gifted {amount} Hiwa{each} to {names}!\n"
+        f"Your new balance: {balances[sender_id]} Hiwa"
+    )
+
+    sender_name = sender.username or sender.first_name
+    notify(context, [
+        (recipient_id,
+         f"🎁 You received {amount} Hiwa from @{sender_name}!\n"
+         f"New balance: {balances[recipient_id]} Hiwa")
+        for recipient_id in recipients
+    ])
+
+async def admin_airdrop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin command to credit every tracked member of the current group."""
+    user_id = update.effective_user.id
+    if user_id not in config.ADMINS:
+        await update.message.reply_text("This command is for admins only.")
+        return
+
+    chat = update.effective_chat
+    if chat.type == "private":
+        await update.message.reply_text("❌ Use /airdrop inside a group.")
+        return
+
+    try:
+        amount = int(context.args[0])
+    except (ValueError, IndexError):
+        await update.message.reply_text("Usage: /airdrop <amount>")
+        return
+    if amount < 1:
+        await update.message.reply_text("Amount must be at least 1 Hiwa.")
+        return
+
+    members = [uid for uid in chat_boards.chat_members(chat.id) if db.user_exists(uid)]
+    if not members:
+        await update.message.reply_text("❌ No tracked members in this group yet.")
+        return
+
+    balances = db.apply_balance_changes({uid: amount for uid in members}, reason="airdrop")
+    await update.message.reply_text(
+        f"🪂 Airdropped {amount} Hiwa to {len(members)} members "
+        f"({amount * len(members):,} Hiwa total)."
+    )
+
+    notify(context, [
+        (uid, f"🪂 Airdrop! You received {amount} Hiwa in {chat.title or 'a group'}.\n"
+              f"New balance: {balances[uid]} Hiwa")
+        for uid in members
+    ])
+
+# ---- group tournaments (/tournament) ----
+def build_tournament_keyboard(game: MinesGame, chat_id: int, user_id: int) -> InlineKeyboardMarkup:
+    """Keyboard for a tournament entrant's copy of the shared board.
+
+    Boards share one layout, so they are sent in private chats and only show
+    the entrant's own taps, even after they bust or lock in; the seeds are
+    revealed at settlement. Callback data carries the group's chat id.
+    """
+    tapped = set(game.reveals)
+    keyboard = []
+    for i in range(5):
+        row = []
+        for j in range(5):
+            tile = game.board[i][j]
+            text = tile.value if i * 5 + j in tapped else "🟦"
+            callback = "ignore" if game.game_over else f"treveal_{i}_{j}_{chat_id}_{user_id}"
+            row.append(InlineKeyboardButton(text, callback_data=callback))
+        keyboard.append(row)
+
+    if game.gems_revealed >= 2 and not game.game_over:
+        keyboard.append([
+            InlineKeyboardButton(
+                f"🔒 Lock In ({game.current_multiplier:.2f}x)",
+                callback_data=f"tlock_{chat_id}_{user_id}"
+            )
+        ])
+    return InlineKeyboardMarkup(keyboard)
+
+async def tournament_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /tournament <fee> <mines> <minutes>, /tournament join and /tournament status."""
+    user = update.effective_user
+    chat = update.effective_chat
+
+    if chat.type == "private":
+        await update.message.reply_text("❌ Tournaments can only be run in groups.")
+        return
+
+    args = context.args or []
+    active = tournament_mode.get_active(chat.id)
+
+    if args and args[0].lower() == "join":
+        await tournament_join(update, context, active)
+        return
+
+    if args and args[0].lower() == "status":
+        if not active:
+            await update.message.reply_text("❌ No tournament is running in this chat.")
+            return
         await update.message.reply_text(
-            f"❌ User '@{recipient_username}' not found. "
-            "Make sure they have started the bot and their username is visible."
+            f"🏟 Tournament: {len(active.entrants)} entrants, "
+            f"{active.prize_pool} Hiwa prize pool\n"
+            f"Entry: {active.entry_fee} Hiwa | Mines: {active.mines_count}\n"
+            f"Ends at {active.deadline.strftime('%Y-%m-%d %H:%M:%S')}"
         )
         return
 
-    if sender_id == recipient_id:
-        await update.message.reply_text("❌ You can't gift yourself!")
+    if active:
+        await update.message.reply_text("❌ A tournament is already running here. Use /tournament join")
         return
 
-    if not db.has_sufficient_balance(sender_id, amount):
-        await update.message.reply_text("❌ Insufficient balance for this gift.")
+    try:
+        fee, mines, minutes = int(args[0]), int(args[1]), int(args[2])
+    except (ValueError, IndexError):
+        await update.message.reply_text(
+            "Usage: /tournament <entry fee> <mines> <minutes>\n"
+            "Example: /tournament 100 5 30\n"
+            "Then players use /tournament join"
+        )
         return
 
-    # Transfer funds
-    db.deduct_balance(sender_id, amount)
-    db.add_balance(recipient_id, amount)
+    if fee < 1 or mines < 3 or mines > 24 or minutes < 1 or minutes > 1440:
+        await update.message.reply_text("Invalid input!\nFee ≥1 | Mines 3–24 | Minutes 1–1440")
+        return
 
-    sender_balance = db.get_balance(sender_id)
-    recipient_balance = db.get_balance(recipient_id)
+    deadline = datetime.datetime.now() + datetime.timedelta(minutes=minutes)
+    new_tournament = tournament_mode.Tournament(chat.id, user.id, fee, mines, deadline)
+    tournament_mode.tournaments[chat.id] = new_tournament
+    start_tournament_timer(context.bot, new_tournament)
 
     await update.message.reply_text(
-        f"🎁 You gifted {amount} Hiwa to @{recipient_username}!\n"
-        f"Your new balance: {sender_balance} Hiwa"
+        f"🏟 {user.first_name} started a Mines tournament!\n"
+        f"Entry: {fee} Hiwa | Mines: {mines}\n"
+        f"Everyone plays the same board in a private chat with me. Highest multiplier wins.\n"
+        f"Seed hash: {new_tournament.server_seed_hash}\n"
+        f"Ends at {deadline.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        "Use /tournament join to enter."
     )
 
+async def tournament_join(update: Update, context: ContextTypes.DEFAULT_TYPE, active) -> None:
+    """Send the entrant their copy of the board in private, then deduct the entry fee.
+
+    The group only gets a summary: a public board would show everyone which
+    tiles of the shared layout are safe.
+    """
+    user = update.effective_user
+    chat_id = update.effective_chat.id
+
+    if not active:
+        await update.message.reply_text("❌ No tournament is running in this chat.")
+        return
+    if datetime.datetime.now() >= active.deadline:
+        await update.message.reply_text("❌ Entries for this tournament are closed.")
+        return
+    if user.id in active.entrants:
+        await update.message.reply_text("❌ You already entered this tournament.")
+        return
+    if not db.user_exists(user.id) or not db.has_sufficient_balance(user.id, active.entry_fee):
+        await update.message.reply_text(f"❌ You need {active.entry_fee} Hiwa to enter!")
+        return
+
+    game = active.new_board(db.get_selected_emoji(user.id))
     try:
-        await context.bot.send_message(
-            chat_id=recipient_id,
-            text=f"🎁 You received {amount} Hiwa from @{sender.username or sender.first_name}!\n"
-                 f"New balance: {recipient_balance} Hiwa"
+        message = await context.bot.send_message(
+            chat_id=user.id,
+            text=(
+                f"🏟 {user.first_name}'s Tournament Board ({update.effective_chat.title or 'group'})\n"
+                f"Mines: {game.mines_count}\n"
+                "Tap tiles, then lock in your multiplier!"
+            ),
+            reply_markup=build_tournament_keyboard(game, chat_id, user.id)
         )
+    except (Forbidden, BadRequest):
+        await update.message.reply_text("❌ Open a private chat with me and press Start, then join again.")
+        return
+
+    # The send yielded to other updates; re-check before taking the fee
+    if (active.settled or datetime.datetime.now() >= active.deadline or user.id in active.entrants
+            or not db.has_sufficient_balance(user.id, active.entry_fee)):
+        try:
+            await context.bot.edit_message_text("❌ Entry cancelled.", chat_id=user.id, message_id=message.message_id)
+        except Exception as e:
+            logger.error(f"Tournament board error: {e}")
+        return
+
+    with db.batch():
+        db.deduct_balance(user.id, active.entry_fee, reason="tournament")
+        db.record_tournament_entry(chat_id, context.bot.id, active.entry_fee, user.id)
+    active.join(user.id, user.first_name, game)
+    game.message_id = message.message_id
+    await update.message.reply_text(
+        f"🏟 {user.first_name} joined the tournament! Your board is in our private chat.\n"
+        f"Prize pool: {active.prize_pool} Hiwa"
+    )
+
+async def tournament_click(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle tile taps and lock-ins on tournament boards."""
+    query = update.callback_query
+    data = query.data.split('_')
+    chat_id = int(data[-2])
+    user_id = int(data[-1])
+
+    if query.from_user.id != user_id:
+        await query.answer("You can't play someone else's board!", show_alert=True)
+        return
+
+    active = tournament_mode.get_active(chat_id)
+    game = active.entrants.get(user_id) if active else None
+    if not game or game.game_over:
+        await query.answer("This tournament board is closed.")
+        return
+
+    await query.answer()
+
+    if data[0] == 'tlock':
+        if game.gems_revealed < 2:
+            return
+        score = active.finish(user_id, locked_in=True)
+        text = f"🔒 {query.from_user.first_name} locked in {score:.2f}x"
+    else:
+        success, result = game.reveal_tile(int(data[1]), int(data[2]))
+        if result == 'already_revealed':
+            return
+        if success:
+            text = (
+                f"🏟 {query.from_user.first_name}'s Tournament Board\n"
+                f"Gems Found: {game.gems_revealed}\n"
+                f"Multiplier: {game.current_multiplier:.2f}x"
+            )
+        else:
+            active.finish(user_id, locked_in=False)
+            text = f"💥 {query.from_user.first_name} hit a mine and is out!"
+
+    try:
+        await query.edit_message_text(text=text, reply_markup=build_tournament_keyboard(game, chat_id, user_id))
     except Exception as e:
-        logger.error(f"Failed to notify recipient: {e}")
+        logger.error(f"Tournament board error: {e}")
+
+# {chat_id: (bot_id, timer task)}; plain asyncio tasks, since Application.stop()
+# waits for tasks started with Application.create_task, here for up to a day
+tournament_timers: Dict[int, Tuple[int, asyncio.Task]] = {}
+
+def start_tournament_timer(bot, active) -> None:
+    task = asyncio.get_running_loop().create_task(run_tournament_timer(bot, active))
+    tournament_timers[active.chat_id] = (bot.id, task)
+
+    def forget(done: asyncio.Task) -> None:
+        if tournament_timers.get(active.chat_id, (None, None))[1] is done:
+            del tournament_timers[active.chat_id]
+    task.add_done_callback(forget)
+
+def cancel_tournament_timers(bot_id: int) -> None:
+    """Stop a bot's pending timers; their paid entries are refunded at the next start."""
+    for chat_id, (timer_bot_id, task) in list(tournament_timers.items()):
+        if timer_bot_id == bot_id:
+            task.cancel()
+            del tournament_timers[chat_id]
+
+async def run_tournament_timer(bot, active) -> None:
+    """Wait for the deadline, then settle."""
+    delay = (active.deadline - datetime.datetime.now()).total_seconds()
+    await asyncio.sleep(max(0.0, delay))
+    await settle_tournament(bot, active)
+
+async def settle_tournament(bot, active) -> None:
+    """Pay out every entrant in one storage write and post a single results message."""
+    if active.settled:
+        return
+    active.close()
+    payouts = active.payouts()
+
+    with db.batch():
+        for uid, amount in payouts.items():
+            db.add_balance(uid, amount, reason="tournament")
+        db.clear_tournament(active.chat_id)
+    active.settled = True
+    tournament_mode.tournaments.pop(active.chat_id, None)
+
+    if not active.entrants:
+        text = "🏟 Tournament ended with no entrants."
+    else:
+        lines = [f"<b>🏟 TOURNAMENT RESULTS</b> — pool {active.prize_pool:,} Hiwa\n"]
+        medals = ["🥇", "🥈", "🥉"]
+        for i, (uid, score) in enumerate(active.rankings(), start=1):
+            prefix = medals[i - 1] if i <= 3 else f"{i}."
+            name = html.escape(active.names.get(uid, "Unknown"))
+            won = payouts.get(uid, 0)
+            lines.append(f"{prefix} {name} — {score:.2f}x — <b>{won:,}</b> Hiwa")
+        lines.append(f"\nServer seed: {active.server_seed}\nClient seed: {active.client_seed} | Nonce: 0")
+        text = "\n".join(lines)
+
+    try:
+        await bot.send_message(chat_id=active.chat_id, text=text, parse_mode=ParseMode.HTML)
+    except Exception as e:
+        logger.error(f"Tournament results error: {e}")
 
 async def admin_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Admin command to broadcast a message to all users and groups."""
@@ -784,8 +1275,10 @@ async def admin_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     message = " ".join(context.args)
-    users = db.get_all_users()
-    groups = db.get_all_groups()  # Ensure this function exists in your database handler
+    # Only users and groups of this bot; the primary bot also owns untracked legacy records
+    legacy = context.bot.id == config.PRIMARY_BOT_ID
+    users = db.get_bot_users(context.bot.id, include_legacy=legacy)
+    groups = db.get_all_groups(context.bot.id, include_legacy=legacy)
     all_chats = users + groups
 
     # Create invisible mention using the admin's ID
@@ -843,13 +1336,265 @@ async def admin_set_balance(update: Update, context: ContextTypes.DEFAULT_TYPE)
     db.set_balance(target_id, amount)
     await update.message.reply_text(f"Set @{username}'s balance to {amount} Hiwa.")
 
-def main() -> None:
-    """Start the bot."""
-    application = (
-    Application.builder()
-    .token(config.TOKEN)
-    .build()
+async def admin_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin command to profile handlers for a bounded window."""
+    user_id = update.effective_user.id
+    if user_id not in config.ADMINS:
+        await update.message.reply_text("This command is for admins only.")
+        return
+
+    usage = (
+        "Usage: /profile <sample|cprofile> <N> [updates|seconds]\n"
+        "/profile stop | /profile status"
     )
+    args = context.args or []
+    action = args[0].lower() if args else "status"
+
+    if action == "status":
+        if profiling.is_active():
+            await update.message.reply_text("🔬 Profiling is running.")
+        else:
+            last = profiling.last_result
+            await update.message.reply_text(f"Profiling is off.{f' Last output: {last}' if last else ''}\n{usage}")
+        return
+
+    if action == "stop":
+        stem = profiling.stop()
+        if stem is None:
+            await update.message.reply_text("Profiling is not running.")
+        else:
+            await update.message.reply_text(f"✅ Profile written to {stem}.collapsed / {stem}.txt")
+        return
+
+    if action not in ("sample", "cprofile"):
+        await update.message.reply_text(usage)
+        return
+
+    try:
+        amount = int(args[1]) if len(args) > 1 else 30
+        unit = args[2].lower() if len(args) > 2 else "seconds"
+    except ValueError:
+        await update.message.reply_text(usage)
+        return
+    if amount < 1 or unit not in ("updates", "seconds"):
+        await update.message.reply_text(usage)
+        return
+
+    try:
+        profiling.start(
+            context.application,
+            mode=action,
+            max_updates=amount if unit == "updates" else None,
+            seconds=amount if unit == "seconds" else 600
+        )
+    except RuntimeError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    await update.message.reply_text(f"🔬 Profiling ({action}) for the next {amount} {unit}.")
+
+def memory_subsystems():
+    """(object counts, {name: root object}) for memory accounting."""
+    games = sum(len(chat_games) for chat_games in user_games.values())
+    storage = db.storage_stats()
+    counts = {
+        "Chats with games": len(user_games),
+        "Live games": games,
+        "Tiles": games * 25,
+        "Tournaments": len(tournament_mode.tournaments),
+        "Users resident": storage["resident"],
+        "Users total": storage["total"],
+    }
+    subsystems = {
+        "user_games": user_games,
+        "tournaments": tournament_mode.tournaments,
+        "db.data": db.data,
+        "chat_boards": chat_boards,
+        "economy": economy,
+        "callback_guard": callback_guard.guard,
+        "user_sync": user_sync.cache,
+        "rate_limit": rate_limit.limiter,
+        "archive buffer": archive._buffer,
+    }
+    return counts, subsystems
+
+async def admin_memory(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin command to report memory use and diff tracemalloc snapshots."""
+    user_id = update.effective_user.id
+    if user_id not in config.ADMINS:
+        await update.message.reply_text("This command is for admins only.")
+        return
+
+    args = context.args or []
+    action = args[0].lower() if args else "report"
+    if action == "snap":
+        path = memory_usage.snapshot()
+        if path is None:
+            await update.message.reply_text("📸 Baseline snapshot taken. Run /memory snap again to diff.")
+        else:
+            await update.message.reply_text(f"✅ Snapshot diff written to {path}")
+        return
+    if action == "stop":
+        memory_usage.stop_tracing()
+        await update.message.reply_text("tracemalloc stopped.")
+        return
+    if action != "report":
+        await update.message.reply_text("Usage: /memory [snap|stop]")
+        return
+
+    counts, subsystems = memory_subsystems()
+    await update.message.reply_text(memory_usage.format_report(counts, memory_usage.measure(subsystems)))
+
+# Applications whose background tasks are running (one per bot token)
+running_applications: List[Application] = []
+
+def live_stats() -> dict:
+    """Snapshot served by the HTTP API's /stats."""
+    storage = db.storage_stats()
+    return {
+        "users": storage["total"],
+        "live_games": sum(len(chat_games) for chat_games in user_games.values()),
+        "chats_with_games": len(user_games),
+        "tournaments": sum(1 for t in tournament_mode.tournaments.values() if not t.settled),
+        "supply": economy.supply,
+        "games_by_mines": db.get_game_stats(),
+    }
+
+def render_metrics() -> str:
+    outboxes = [app.bot_data["outbox"] for app in running_applications if "outbox" in app.bot_data]
+    return metrics.render(economy, outboxes)
+
+def refund_interrupted_tournaments(application: Application) -> None:
+    """Refund entry fees of this bot's tournaments that a restart cut short."""
+    for chat_id, entry in db.open_tournaments().items():
+        if entry.get("bot_id") not in (None, application.bot.id):
+            continue
+        with db.batch():
+            for uid in entry["entrants"]:
+                if db.user_exists(uid):
+                    db.add_balance(uid, entry["entry_fee"], reason="tournament")
+            db.clear_tournament(chat_id)
+        application.bot_data["outbox"].put(
+            chat_id, "🏟 The tournament here was interrupted by a restart. Entry fees have been refunded."
+        )
+        logger.info(f"Refunded {len(entry['entrants'])} entries of an interrupted tournament in {chat_id}")
+
+def save_live_games() -> None:
+    """Persist unfinished games as seeds and reveals; their stakes are already deducted."""
+    sessions = {
+        str(chat_id): {str(user_id): game.to_dict() for user_id, game in chat_games.items() if not game.game_over}
+        for chat_id, chat_games in user_games.items()
+    }
+    sessions = {chat_id: chat_games for chat_id, chat_games in sessions.items() if chat_games}
+    db.save_sessions(sessions)
+    if sessions:
+        logger.info(f"Saved {sum(len(g) for g in sessions.values())} live games")
+
+def restore_live_games() -> None:
+    """Rebuild the games saved at the last shutdown so their boards stay playable."""
+    restored = 0
+    for chat_id, chat_games in db.pop_sessions().items():
+        for user_id, state in chat_games.items():
+            try:
+                game = MinesGame.from_dict(state)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"Could not restore game of {user_id} in {chat_id}: {e}")
+                continue
+            user_games.setdefault(int(chat_id), {})[int(user_id)] = game
+            restored += 1
+    if restored:
+        logger.info(f"Restored {restored} live games")
+
+async def start_background_tasks(application: Application) -> None:
+    """post_init hook: start per-bot background workers, then replay the backlog."""
+    await outbox.start(application)
+    refund_interrupted_tournaments(application)
+    if not running_applications:
+        # Process-wide state and workers: set up by the first bot only
+        restore_live_games()
+        memory_usage.start_reporting(config.MEMORY_REPORT_INTERVAL, memory_subsystems)
+        archive.start_flushing(config.ARCHIVE_FLUSH_INTERVAL)
+        if config.HTTP_API_PORT:
+            # Flask is only needed when the API is enabled
+            import http_api
+            http_api.start(db, config.HTTP_API_HOST, config.HTTP_API_PORT, live_stats, render_metrics)
+    running_applications.append(application)
+    if application.updater is not None:
+        await catchup.drain_backlog(application)
+
+async def stop_background_tasks(application: Application) -> None:
+    """post_shutdown hook: stop workers and persist their queues."""
+    cancel_tournament_timers(application.bot.id)
+    await outbox.stop(application)
+    if application in running_applications:
+        running_applications.remove(application)
+    if not running_applications:
+        save_live_games()
+        await memory_usage.stop_reporting()
+        await archive.stop_flushing()
+        if config.HTTP_API_PORT:
+            import http_api
+            http_api.stop()
+    archive.flush()
+    db.flush()
+
+async def admin_archive(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin command to query the finished-game archive."""
+    user_id = update.effective_user.id
+    if user_id not in config.ADMINS:
+        await update.message.reply_text("This command is for admins only.")
+        return
+
+    args = context.args or []
+    kind = args[0].lower() if args else "rtp"
+    try:
+        hours = float(args[1]) if len(args) > 1 else 0
+    except ValueError:
+        hours = -1
+    if kind not in ("rtp", "busts", "top") or hours < 0:
+        await update.message.reply_text("Usage: /archive <rtp|busts|top> [hours]")
+        return
+
+    await update.message.reply_text(format_report(archive, kind, hours))
+
+async def admin_bulk(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin command to change balances of every user matching a filter."""
+    user_id = update.effective_user.id
+    if user_id not in config.ADMINS:
+        await update.message.reply_text("This command is for admins only.")
+        return
+
+    try:
+        selector, operation, dry_run = bulk_ops.parse_command(context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(
+            f"❌ {e}\n"
+            "Usage: /bulk <set|add|multiply|cap> <value> [min=N] [max=N] [inactive=DAYS] [emoji=X] [dry]"
+        )
+        return
+
+    try:
+        summary = bulk_ops.run(db, selector, operation, dry_run=dry_run, actor=f"telegram:{user_id}")
+    except Exception as e:
+        logger.error(f"Bulk operation failed: {e}")
+        await update.message.reply_text(f"❌ Bulk operation stopped: {e}\nChunks already applied are listed in audit.jsonl.")
+        return
+    await update.message.reply_text(bulk_ops.format_summary(selector, operation, summary))
+
+async def admin_economy(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin command to show live economy counters."""
+    user_id = update.effective_user.id
+    if user_id not in config.ADMINS:
+        await update.message.reply_text("This command is for admins only.")
+        return
+
+    await update.message.reply_text(economy.report(), parse_mode=ParseMode.HTML)
+
+def register_handlers(application: Application) -> Application:
+    """Attach every bot handler to an Application."""
+    # Update counter for /profile <mode> N updates; idle unless a session needs it
+    application.add_handler(TypeHandler(Update, profiling.count_update), group=profiling.COUNTER_GROUP)
+    # Rate limiter runs before everything else
+    application.add_handler(TypeHandler(Update, rate_limit.throttle), group=-2)
 
     # Message Handler
     application.add_handler(
@@ -859,6 +1604,11 @@ def main() -> None:
     ),
     group=-1
     )
+    # Duplicate taps and taps on finished boards stop here, after rate limiting
+    application.add_handler(
+        CallbackQueryHandler(callback_guard.filter_callbacks, pattern=r"^((reveal|cashout)_|ignore$)"),
+        group=-1
+    )
     
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, track_groups))
     
@@ -872,23 +1622,88 @@ def main() -> None:
     application.add_handler(CommandHandler("daily", daily_bonus))
     application.add_handler(CommandHandler("weekly", weekly_bonus))
     application.add_handler(CommandHandler("leaderboard", leaderboard))
+    application.add_handler(CommandHandler("stats", stats_command))
     application.add_handler(CommandHandler("store", store))
     application.add_handler(CommandHandler("buy", buy_emoji))
     application.add_handler(CommandHandler("set", set_emoji))
     application.add_handler(CommandHandler("collection", collection))
+    application.add_handler(CommandHandler("clientseed", client_seed_command))
+    application.add_handler(CommandHandler("verify", verify_command))
     application.add_handler(CommandHandler("give", emoji_gift))
     application.add_handler(CommandHandler("gift", gift))
+    application.add_handler(CommandHandler("tournament", tournament_command))
     
     # Admin commands
     application.add_handler(CommandHandler("broadcast", admin_broadcast))
     application.add_handler(CommandHandler("reset", admin_reset_data))
     application.add_handler(CommandHandler("setbalance", admin_set_balance))
+    application.add_handler(CommandHandler("profile", admin_profile))
+    application.add_handler(CommandHandler("airdrop", admin_airdrop))
+    application.add_handler(CommandHandler("archive", admin_archive))
+    application.add_handler(CommandHandler("economy", admin_economy))
+    application.add_handler(CommandHandler("bulk", admin_bulk))
+    application.add_handler(CommandHandler("memory", admin_memory))
 
     # --- Mines handlers ---
-    application.add_handler(CallbackQueryHandler(button_click, pattern=r"^(reveal|cashout)_"))
-    
-    # Run the bot
-    application.run_polling()
+    application.add_handler(CallbackQueryHandler(callback_guard.remember_on_success(button_click), pattern=r"^(reveal|cashout)_"))
+    application.add_handler(CallbackQueryHandler(tournament_click, pattern=r"^t(reveal|lock)_"))
+
+    # Inline mode: @bot top / @bot balance
+    application.add_handler(InlineQueryHandler(inline_query))
+    return application
+
+async def run_bots(tokens) -> None:
+    """Poll several bot tokens on one event loop; all share db and user_games."""
+    applications = [
+        register_handlers(Application.builder().token(token).build())
+        for token in tokens
+    ]
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    started = []
+    try:
+        for application in applications:
+            await application.initialize()
+            started.append(application)
+            await start_background_tasks(application)
+            await application.updater.start_polling()
+            await application.start()
+            logger.info(f"Bot @{application.bot.username} is polling")
+        await stop_event.wait()
+    finally:
+        for application in reversed(started):
+            if application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await stop_background_tasks(application)
+            await application.shutdown()
+
+def main() -> None:
+    """Start the bot."""
+    tokens = config.TOKENS or [config.TOKEN]
+    if len(tokens) == 1:
+        application = (
+        Application.builder()
+        .token(tokens[0])
+        .post_init(start_background_tasks)
+        .post_shutdown(stop_background_tasks)
+        .build()
+        )
+        register_handlers(application)
+
+        # Run the bot
+        application.run_polling()
+        return
+
+    asyncio.run(run_bots(tokens))
 
 if __name__ == '__main__':
     main()
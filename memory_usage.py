@@ -0,0 +1,168 @@
+"""Memory accounting for in-process state.
+
+deep_size() walks an object graph with sys.getsizeof, counting each object
+once, so subsystem sizes are approximate but comparable over time. A
+periodic reporter appends one JSON line per run to DATA_DIR/memory/usage.jsonl
+for capacity planning, and tracemalloc snapshots can be diffed against the
+previous one with the result written to DATA_DIR/memory.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import sys
+import time
+import tracemalloc
+import types
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from database import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+MEMORY_DIR = DATA_DIR / "memory"
+TRACE_FRAMES = 10
+DIFF_TOP_N = 30
+
+# Code and module objects are shared by everything; never walk into them
+SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+              types.MethodType, types.CodeType, types.FrameType)
+ATOMIC_TYPES = (str, bytes, int, float, bool, type(None))
+
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+_reporter: Optional[asyncio.Task] = None
+
+
+def deep_size(obj: Any, exclude: Iterable[Any] = ()) -> Dict[str, int]:
+    """Approximate deep size in bytes and number of objects reachable from obj.
+
+    Objects in `exclude` (and everything only reachable through them) are
+    not counted, so subsystems that reference each other are not double-counted.
+    """
+    seen = {id(item) for item in exclude}
+    stack = [obj]
+    total = objects = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, SKIP_TYPES):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        objects += 1
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif not isinstance(item, ATOMIC_TYPES):
+            if hasattr(item, "__dict__"):
+                stack.append(item.__dict__)
+            for cls in type(item).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    if hasattr(item, slot):
+                        stack.append(getattr(item, slot))
+    return {"bytes": total, "objects": objects}
+
+
+def measure(subsystems: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """deep_size() of each named subsystem, not counting the others inside it."""
+    roots = list(subsystems.values())
+    return {
+        name: deep_size(obj, [other for other in roots if other is not obj])
+        for name, obj in subsystems.items()
+    }
+
+
+def format_report(counts: Dict[str, int], sizes: Dict[str, Dict[str, int]]) -> str:
+    """Text summary for /memory."""
+    lines = ["🧠 Memory usage"]
+    lines.extend(f"{name}: {value:,}" for name, value in counts.items())
+    lines.append("")
+    for name, size in sorted(sizes.items(), key=lambda kv: kv[1]["bytes"], reverse=True):
+        lines.append(f"{name}: {size['bytes'] / 1024:,.1f} KiB in {size['objects']:,} objects")
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(f"\ntracemalloc: {current / 1048576:.1f} MiB now, {peak / 1048576:.1f} MiB peak")
+    return "\n".join(lines)
+
+
+def snapshot() -> Optional[str]:
+    """Take a tracemalloc snapshot and diff it against the previous one.
+
+    Starts tracing on first use (only allocations made after that are seen).
+    Returns the path of the written diff, or None for the baseline snapshot.
+    """
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+    current = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    previous, _previous_snapshot = _previous_snapshot, current
+    if previous is None:
+        return None
+
+    MEMORY_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = MEMORY_DIR / f"diff-{stamp}.txt"
+    stats = current.compare_to(previous, "traceback")
+    with open(path, "w") as f:
+        growth = sum(stat.size_diff for stat in stats)
+        f.write(f"Net change: {growth / 1024:+,.1f} KiB across {len(stats)} allocation sites\n\n")
+        for stat in stats[:DIFF_TOP_N]:
+            f.write(f"{stat.size_diff / 1024:+,.1f} KiB ({stat.count_diff:+,} blocks), "
+                    f"{stat.size / 1024:,.1f} KiB total\n")
+            for line in stat.traceback.format():
+                f.write(f"    {line}\n")
+            f.write("\n")
+    return str(path)
+
+
+def stop_tracing() -> None:
+    global _previous_snapshot
+    _previous_snapshot = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def record(counts: Dict[str, int], sizes: Dict[str, Dict[str, int]]) -> None:
+    """Append one usage sample to DATA_DIR/memory/usage.jsonl."""
+    MEMORY_DIR.mkdir(parents=True, exist_ok=True)
+    sample = {"ts": time.time(), "counts": counts,
+              "bytes": {name: size["bytes"] for name, size in sizes.items()}}
+    with open(MEMORY_DIR / "usage.jsonl", "a") as f:
+        f.write(json.dumps(sample) + "\n")
+
+
+def start_reporting(interval: float, collect: Callable[[], tuple]) -> None:
+    """Run collect() -> (counts, subsystems) every `interval` seconds; once per process."""
+    global _reporter
+    if interval <= 0 or (_reporter is not None and not _reporter.done()):
+        return
+
+    async def run() -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                counts, subsystems = collect()
+                sizes = measure(subsystems)
+                record(counts, sizes)
+                total = sum(size["bytes"] for size in sizes.values())
+                logger.info(f"Memory: {total / 1048576:.1f} MiB tracked, {counts}")
+            except Exception as e:
+                logger.error(f"Memory report failed: {e}")
+
+    _reporter = asyncio.get_running_loop().create_task(run())
+
+
+async def stop_reporting() -> None:
+    global _reporter
+    if _reporter is not None:
+        _reporter.cancel()
+        try:
+            await _reporter
+        except asyncio.CancelledError:
+            pass
+        _reporter = None
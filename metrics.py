@@ -0,0 +1,51 @@
+"""Plain-text metrics exposition (Prometheus format) for the bot process.
+
+render() only reads in-memory counters; it never touches the user store.
+"""
+from typing import Iterable, List
+
+import callback_guard
+import rate_limit
+import user_sync
+from economy import Economy
+
+
+def _line(lines: List[str], name: str, value, **labels) -> None:
+    if labels:
+        label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+        lines.append(f"{name}{{{label_text}}} {value}")
+    else:
+        lines.append(f"{name} {value}")
+
+
+def render(economy: Economy, outboxes: Iterable = ()) -> str:
+    lines: List[str] = []
+    _line(lines, "hiwa_supply", economy.supply)
+    _line(lines, "hiwa_users", economy.users)
+    for period, figures in economy.snapshot().items():
+        _line(lines, "hiwa_house_profit", figures["house_profit"], window=period)
+        for reason, amount in sorted(figures["issued"].items()):
+            _line(lines, "hiwa_issued", amount, window=period, reason=reason)
+        for reason, amount in sorted(figures["sunk"].items()):
+            _line(lines, "hiwa_sunk", amount, window=period, reason=reason)
+
+    for scope, count in sorted(rate_limit.limiter.rejections.items()):
+        _line(lines, "rate_limit_rejections", count, scope=scope)
+
+    guard = callback_guard.guard
+    _line(lines, "callback_passed", guard.passed)
+    for reason, count in sorted(guard.suppressed.items()):
+        _line(lines, "callback_suppressed", count, reason=reason)
+
+    sync = user_sync.cache
+    _line(lines, "user_sync_hits", sync.hits)
+    _line(lines, "user_sync_misses", sync.misses)
+    _line(lines, "user_sync_name_changes", sync.name_changes)
+
+    for box in outboxes:
+        bot = box.bot.id
+        _line(lines, "outbox_pending", len(box.pending), bot=bot)
+        _line(lines, "outbox_sent", box.sent, bot=bot)
+        _line(lines, "outbox_failed", box.failed, bot=bot)
+        _line(lines, "outbox_retried", box.retried, bot=bot)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,150 @@
+"""Background delivery of side-effect notifications.
+
+Handlers push (chat_id, text) items with Outbox.put() and return immediately;
+a worker task drains the queue in paced batches, retries transient errors and
+keeps undelivered items in DATA_DIR/outbox-<bot_id>.json across restarts.
+A RetryAfter flood-wait pauses the whole queue, not just the failed item.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.error import Forbidden, BadRequest, RetryAfter, TelegramError
+
+from database import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 20
+# Delay between sends (Telegram allows ~30 messages/s per bot)
+SEND_INTERVAL = 0.05
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 2.0
+
+
+class Outbox:
+    def __init__(self, bot, path: Optional[str] = None):
+        self.bot = bot
+        self.path = path or str(DATA_DIR / f"outbox-{bot.id}.json")
+        self.pending: List[Dict[str, Any]] = self._load()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        # Flood-wait from Telegram applies to the bot, so it pauses every send
+        self.paused_until = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _load(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read outbox {self.path}: {e}")
+            return []
+
+    def _save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.pending, f)
+        os.replace(tmp, self.path)
+
+    def put(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        """Queue a message; extra kwargs are passed to send_message."""
+        self.put_many([(chat_id, text)], **kwargs)
+
+    def put_many(self, messages: List[Tuple[int, str]], **kwargs: Any) -> None:
+        """Queue several (chat_id, text) messages with one journal write."""
+        for chat_id, text in messages:
+            self.pending.append({"chat_id": chat_id, "text": text, "kwargs": kwargs, "attempts": 0, "not_before": 0})
+        self._save()
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._save()
+
+    async def _run(self) -> None:
+        while True:
+            now = time.time()
+            if self.paused_until > now:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            ready = [item for item in self.pending if item["not_before"] <= now][:BATCH_SIZE]
+            if not ready:
+                self._wakeup.clear()
+                delays = [item["not_before"] - now for item in self.pending]
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delays) if delays else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            done = set()
+            for item in ready:
+                if await self._deliver(item):
+                    done.add(id(item))
+                if self.paused_until > time.time():
+                    # Rest of the batch waits for the flood-wait to end
+                    break
+                await asyncio.sleep(SEND_INTERVAL)
+            self.pending = [item for item in self.pending if id(item) not in done]
+            self._save()
+
+    async def _deliver(self, item: Dict[str, Any]) -> bool:
+        """Try one send; False means keep the item for a retry."""
+        try:
+            await self.bot.send_message(chat_id=item["chat_id"], text=item["text"], **item["kwargs"])
+        except RetryAfter as e:
+            self.paused_until = time.time() + float(e.retry_after)
+            logger.warning(f"Outbox paused for {float(e.retry_after):.0f}s by flood control")
+            self.retried += 1
+            return False
+        except (Forbidden, BadRequest) as e:
+            # Blocked bot, deleted chat, etc. — retrying won't help
+            logger.warning(f"Dropping notification to {item['chat_id']}: {e}")
+            self.failed += 1
+        except Exception as e:
+            # TelegramError (network, timeouts) and anything unexpected: the
+            # worker must survive, so back off and retry like a transient error
+            if not isinstance(e, TelegramError):
+                logger.exception(f"Unexpected error sending notification to {item['chat_id']}")
+            item["attempts"] += 1
+            if item["attempts"] < MAX_ATTEMPTS:
+                item["not_before"] = time.time() + RETRY_BACKOFF ** item["attempts"]
+                self.retried += 1
+                return False
+            logger.error(f"Giving up on notification to {item['chat_id']}: {e}")
+            self.failed += 1
+        else:
+            self.sent += 1
+        return True
+
+
+async def start(application) -> Outbox:
+    """Create and start the outbox for an initialized Application."""
+    outbox = Outbox(application.bot)
+    application.bot_data["outbox"] = outbox
+    outbox.start()
+    return outbox
+
+
+async def stop(application) -> None:
+    outbox = application.bot_data.get("outbox")
+    if outbox is not None:
+        await outbox.stop()
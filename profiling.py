@@ -0,0 +1,205 @@
+"""On-demand handler profiling.
+
+Starting a session either enables cProfile on the event-loop thread or starts
+a background stack sampler. count_update is registered once at startup and
+does nothing unless a session was asked to stop after the next N updates
+(adding handlers from inside a running handler is not safe in PTB).
+Results are written to DATA_DIR/profiles as a collapsed-stack file (for
+flamegraph.pl / speedscope) plus a top-N text summary.
+"""
+import asyncio
+import cProfile
+import datetime
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+
+from database import DATA_DIR
+
+PROFILE_DIR = DATA_DIR / "profiles"
+SAMPLE_INTERVAL = 0.005
+TOP_N = 25
+# Group for the update counter; runs before the rate limiter
+COUNTER_GROUP = -3
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).stem}:{code.co_name}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a daemon thread."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+
+class ProfilingSession:
+    """One bounded profiling window."""
+
+    def __init__(self, application: Application, mode: str, max_updates: Optional[int], seconds: Optional[float]):
+        self.application = application
+        self.mode = mode
+        self.max_updates = max_updates
+        self.seconds = seconds
+        self.updates_seen = 0
+        self.started_at = datetime.datetime.now()
+        self._started = time.perf_counter()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._timer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+
+        if self.seconds:
+            self._timer = asyncio.get_running_loop().create_task(self._expire())
+
+    def count_update(self) -> None:
+        self.updates_seen += 1
+        if self.updates_seen == self.max_updates:
+            stop()
+
+    async def _expire(self) -> None:
+        await asyncio.sleep(self.seconds)
+        stop()
+
+    def finish(self) -> Path:
+        """Stop collecting and write the collapsed stacks and summary."""
+        elapsed = time.perf_counter() - self._started
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stem = PROFILE_DIR / f"{self.started_at.strftime('%Y%m%d-%H%M%S')}-{self.mode}"
+        header = (
+            f"mode={self.mode} window={elapsed:.2f}s updates={self.updates_seen}"
+            f"{'/' + str(self.max_updates) if self.max_updates else ''}\n"
+        )
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            stats = pstats.Stats(self._profiler)
+            stats.dump_stats(str(stem) + ".prof")
+            stacks = _collapse_pstats(stats)
+            buffer = io.StringIO()
+            pstats.Stats(self._profiler, stream=buffer).sort_stats("cumulative").print_stats(TOP_N)
+            summary = header + buffer.getvalue()
+        else:
+            self._sampler.stop()
+            stacks = self._sampler.stacks
+            summary = header + _sample_summary(stacks)
+
+        with open(str(stem) + ".collapsed", "w") as f:
+            for stack, weight in stacks.most_common():
+                f.write(f"{stack} {weight}\n")
+        with open(str(stem) + ".txt", "w") as f:
+            f.write(summary)
+        return stem
+
+
+def _collapse_pstats(stats: pstats.Stats) -> Counter:
+    """Two-level caller;callee stacks weighted by per-caller own time in microseconds."""
+    def label(func) -> str:
+        filename, line, name = func
+        return f"{Path(filename).stem}:{name}:{line}"
+
+    stacks: Counter = Counter()
+    for func, (_, _, tottime, _, callers) in stats.stats.items():
+        if not callers:
+            stacks[label(func)] += int(tottime * 1e6)
+        for caller, caller_stats in callers.items():
+            weight = int(caller_stats[2] * 1e6)
+            if weight:
+                stacks[f"{label(caller)};{label(func)}"] += weight
+    return stacks
+
+
+def _sample_summary(stacks: Counter) -> str:
+    """Top-N frames by self samples and by inclusive samples."""
+    total = sum(stacks.values()) or 1
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+
+    lines = [f"samples={total}\n", "\nTop self:\n"]
+    for frame, count in own.most_common(TOP_N):
+        lines.append(f"{count / total:7.1%}  {frame}\n")
+    lines.append("\nTop inclusive:\n")
+    for frame, count in inclusive.most_common(TOP_N):
+        lines.append(f"{count / total:7.1%}  {frame}\n")
+    return "".join(lines)
+
+
+_session: Optional[ProfilingSession] = None
+last_result: Optional[Path] = None
+
+
+def is_active() -> bool:
+    return _session is not None
+
+
+def start(application: Application, mode: str = "sample", max_updates: Optional[int] = None,
+          seconds: Optional[float] = None) -> ProfilingSession:
+    """Begin a profiling window; at least one of max_updates/seconds should be set."""
+    global _session
+    if _session is not None:
+        raise RuntimeError("Profiling is already running")
+    _session = ProfilingSession(application, mode, max_updates, seconds)
+    _session.start()
+    return _session
+
+
+async def count_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Group COUNTER_GROUP handler: counts updates for an update-bounded session."""
+    if _session is not None and _session.max_updates:
+        _session.count_update()
+
+
+def stop() -> Optional[Path]:
+    """End the running window, if any, and return the output path stem."""
+    global _session, last_result
+    if _session is None:
+        return None
+    session, _session = _session, None
+    last_result = session.finish()
+    return last_result
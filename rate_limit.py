@@ -0,0 +1,145 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+import config
+
+# Map commands and callback prefixes to a throttling family
+COMMAND_FAMILIES = {
+    "mine": "game",
+    "cashout": "game",
+    "end": "game",
+    "daily": "bonus",
+    "weekly": "bonus",
+    "gift": "social",
+    "give": "social",
+    "leaderboard": "social",
+    "reveal": "tap",
+}
+
+
+# bot_data flag set while catchup.drain_backlog replays queued updates
+DRAINING_KEY = "catchup_draining"
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by arbitrary hashables, with LRU eviction of idle buckets.
+
+    Only buckets that have refilled to capacity are evicted, since a fresh
+    bucket starts full; evicting a drained one would hand its tokens back.
+    The table may exceed max_buckets until the oldest buckets have refilled.
+    """
+
+    def __init__(self, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        # key -> [tokens, last refill, capacity, rate]
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()
+        self.rejections: Dict[str, int] = {}
+
+    def _refill(self, key: Hashable, capacity: int, rate: float, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(capacity), now, capacity, rate]
+            self._buckets[key] = bucket
+        else:
+            self._buckets.move_to_end(key)
+            tokens, last = bucket[0], bucket[1]
+            bucket[0] = min(float(capacity), tokens + (now - last) * rate)
+            bucket[1] = now
+            bucket[2], bucket[3] = capacity, rate
+        return bucket
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while len(buckets) > self.max_buckets:
+            tokens, last, capacity, rate = next(iter(buckets.values()))
+            if tokens + (now - last) * rate < capacity:
+                break
+            buckets.popitem(last=False)
+
+    def allow_all(self, limits: List[Tuple[Hashable, int, float]], now: Optional[float] = None) -> Optional[int]:
+        """Take one token from every (key, capacity, rate) bucket, or from none.
+
+        Returns None if all had a token, else the index of the first empty one.
+        """
+        now = time.monotonic() if now is None else now
+        buckets = [self._refill(key, capacity, rate, now) for key, capacity, rate in limits]
+        empty = next((i for i, bucket in enumerate(buckets) if bucket[0] < 1.0), None)
+        if empty is None:
+            for bucket in buckets:
+                bucket[0] -= 1.0
+        self._evict(now)
+        return empty
+
+    def allow(self, key: Hashable, capacity: int, rate: float, now: Optional[float] = None) -> bool:
+        """Take one token from the bucket for `key`; False if it is empty."""
+        return self.allow_all([(key, capacity, rate)], now) is None
+
+    def reject(self, scope: str) -> None:
+        self.rejections[scope] = self.rejections.get(scope, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+limiter = TokenBucketLimiter(config.RATE_LIMIT_MAX_BUCKETS)
+
+
+def classify(update: Update) -> Optional[str]:
+    """Return the command family of an update, or None if it isn't throttled."""
+    if update.callback_query and update.callback_query.data:
+        prefix = update.callback_query.data.split("_", 1)[0]
+        return COMMAND_FAMILIES.get(prefix, "tap")
+
+    message = update.effective_message
+    if message and message.text and message.text.startswith("/"):
+        command = message.text.split()[0][1:].split("@", 1)[0].lower()
+        return COMMAND_FAMILIES.get(command, "command")
+    return None
+
+
+def check(user_id: int, chat_id: Optional[int], family: str) -> Tuple[bool, str]:
+    """Check all buckets that apply; returns (allowed, scope that rejected).
+
+    A rejected update is charged to no bucket.
+    """
+    scopes = ["user"]
+    limits = [(("user", user_id), *config.RATE_LIMIT_USER)]
+    if chat_id is not None and chat_id != user_id:
+        scopes.append("chat")
+        limits.append((("chat", chat_id), *config.RATE_LIMIT_CHAT))
+    family_limits = config.RATE_LIMIT_FAMILY.get(family)
+    if family_limits:
+        scopes.append(family)
+        limits.append(((family, user_id), *family_limits))
+
+    empty = limiter.allow_all(limits)
+    if empty is None:
+        return True, ""
+    return False, scopes[empty]
+
+
+async def throttle(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Drop updates that exceed their buckets before any other handler runs."""
+    if context.bot_data.get(DRAINING_KEY):
+        # Backlog replay: collapse already removed the redundant updates
+        return
+    family = classify(update)
+    if family is None or not update.effective_user:
+        return
+
+    chat_id = update.effective_chat.id if update.effective_chat else None
+    allowed, scope = check(update.effective_user.id, chat_id, family)
+    if allowed:
+        return
+
+    limiter.reject(scope)
+    if update.callback_query:
+        try:
+            await update.callback_query.answer("⏳ Slow down!")
+        except Exception:
+            pass
+    raise ApplicationHandlerStop
@@ -0,0 +1,84 @@
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+from game_logic import MinesGame, hash_server_seed, new_server_seed
+
+# Share of the prize pool paid to 1st, 2nd and 3rd place
+PRIZE_SPLIT = [0.6, 0.3, 0.1]
+
+
+class Tournament:
+    """A group tournament where every entrant plays the same seeded board."""
+
+    def __init__(self, chat_id: int, organizer_id: int, entry_fee: int, mines: int, deadline: datetime.datetime):
+        self.chat_id = chat_id
+        self.organizer_id = organizer_id
+        self.entry_fee = entry_fee
+        self.mines_count = mines
+        self.deadline = deadline
+        # Every entrant's board is derived from the same seeds
+        self.server_seed = new_server_seed()
+        self.server_seed_hash = hash_server_seed(self.server_seed)
+        self.client_seed = f"tournament:{chat_id}"
+        self.entrants: Dict[int, MinesGame] = {}
+        self.names: Dict[int, str] = {}
+        self.scores: Dict[int, float] = {}
+        self.settled = False
+
+    @property
+    def prize_pool(self) -> int:
+        return self.entry_fee * len(self.entrants)
+
+    def new_board(self, player_emoji: str = "💎") -> MinesGame:
+        """A fresh copy of the shared board (not yet registered)."""
+        return MinesGame(self.entry_fee, self.mines_count, player_emoji, self.server_seed, self.client_seed)
+
+    def join(self, user_id: int, name: str, game: MinesGame) -> None:
+        """Register an entrant with their copy of the board."""
+        self.entrants[user_id] = game
+        self.names[user_id] = name
+
+    def finish(self, user_id: int, locked_in: bool) -> float:
+        """Record an entrant's final multiplier (0 if they hit a mine)."""
+        game = self.entrants[user_id]
+        game.game_over = True
+        score = game.current_multiplier if locked_in else 0.0
+        self.scores[user_id] = score
+        return score
+
+    def close(self) -> None:
+        """Lock in unfinished games at the deadline (needs at least 2 gems)."""
+        for user_id, game in self.entrants.items():
+            if user_id not in self.scores:
+                self.finish(user_id, locked_in=game.gems_revealed >= 2)
+
+    def rankings(self) -> List[Tuple[int, float]]:
+        """Entrants ordered by score, ties broken by join order."""
+        order = {uid: i for i, uid in enumerate(self.entrants)}
+        return sorted(self.scores.items(), key=lambda x: (-x[1], order[x[0]]))
+
+    def payouts(self) -> Dict[int, int]:
+        """Split the prize pool among the top scorers; refund if nobody scored."""
+        ranked = [(uid, score) for uid, score in self.rankings() if score > 0]
+        if not ranked:
+            return {uid: self.entry_fee for uid in self.entrants}
+
+        splits = PRIZE_SPLIT[:len(ranked)]
+        total = sum(splits)
+        pool = self.prize_pool
+        payouts = {uid: int(pool * share / total) for (uid, _), share in zip(ranked, splits)}
+        # Rounding remainder goes to the winner
+        winner = ranked[0][0]
+        payouts[winner] += pool - sum(payouts.values())
+        return payouts
+
+
+# {chat_id: Tournament}, one running tournament per chat
+tournaments: Dict[int, Tournament] = {}
+
+
+def get_active(chat_id: int) -> Optional[Tournament]:
+    tournament = tournaments.get(chat_id)
+    if tournament and not tournament.settled:
+        return tournament
+    return None
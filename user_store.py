@@ -0,0 +1,223 @@
+"""Backends for UserDatabase.data["users"].
+
+DictUserStore keeps every user in memory and is serialized with the rest of
+users.json. TieredUserStore keeps a bounded LRU of recently used records in
+memory and the full population in an SQLite file; evicted users fault back
+in on access. Both expose the same mapping interface plus a few bulk helpers
+that let scans stream without warming the cache.
+"""
+import heapq
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Set, Tuple
+
+Record = Dict[str, Any]
+
+SCAN_PAGE = 500
+
+
+class DictUserStore(dict):
+    """All users resident in a plain dict (the original storage layout)."""
+
+    def iter_records(self) -> Iterator[Tuple[str, Record]]:
+        for key in list(self.keys()):
+            record = self.get(key)
+            if record is not None:
+                yield key, record
+
+    def update_all(self, fn: Callable[[str, Record], bool]) -> int:
+        """Apply fn to every record in place; returns how many it reported changed."""
+        return sum(1 for key, record in self.iter_records() if fn(key, record))
+
+    def find_username(self, username: str) -> Optional[str]:
+        username = username.lower()
+        for key, record in self.items():
+            if record.get("username", "").lower() == username:
+                return key
+        return None
+
+    def top_by_balance(self, limit: int) -> List[Tuple[str, Record]]:
+        return heapq.nlargest(limit, self.items(), key=lambda item: _balance(item[1]))
+
+    def flush(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"resident": len(self), "total": len(self)}
+
+
+def _balance(record: Record) -> int:
+    try:
+        return int(record.get("balance", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+class TieredUserStore(MutableMapping):
+    """Hot LRU of user records over an SQLite keyed store.
+
+    Every record handed out through __getitem__ is assumed modified (callers
+    mutate records in place) and is written back on flush() or eviction.
+    Writes share one connection, so reads always see them; flush() commits.
+    """
+
+    def __init__(self, path: str, capacity: int):
+        self.capacity = capacity
+        self._hot: "OrderedDict[str, Record]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " id TEXT PRIMARY KEY,"
+            " username TEXT NOT NULL DEFAULT '',"
+            " balance INTEGER NOT NULL DEFAULT 0,"
+            " record TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS users_username ON users (username)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS users_balance ON users (balance)")
+        self._conn.commit()
+
+    # -- disk helpers -------------------------------------------------------
+
+    def _write(self, rows: List[Tuple[str, Record]]) -> None:
+        self._conn.executemany(
+            "INSERT INTO users (id, username, balance, record) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET username = excluded.username, "
+            "balance = excluded.balance, record = excluded.record",
+            [
+                (key, str(record.get("username", "")).lower(), _balance(record), json.dumps(record))
+                for key, record in rows
+            ]
+        )
+
+    def _read(self, key: str) -> Optional[Record]:
+        row = self._conn.execute("SELECT record FROM users WHERE id = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write_dirty(self) -> None:
+        if self._dirty:
+            self._write([(key, self._hot[key]) for key in self._dirty if key in self._hot])
+            self._dirty.clear()
+
+    def _admit(self, key: str, record: Record) -> None:
+        self._hot[key] = record
+        self._dirty.add(key)
+        while len(self._hot) > self.capacity:
+            old_key, old_record = self._hot.popitem(last=False)
+            if old_key in self._dirty:
+                self._dirty.discard(old_key)
+                self._write([(old_key, old_record)])
+
+    # -- mapping interface --------------------------------------------------
+
+    def __getitem__(self, key: str) -> Record:
+        record = self._hot.get(key)
+        if record is not None:
+            self.hits += 1
+            self._hot.move_to_end(key)
+            self._dirty.add(key)
+            return record
+        self.misses += 1
+        record = self._read(key)
+        if record is None:
+            raise KeyError(key)
+        self._admit(key, record)
+        return record
+
+    def __setitem__(self, key: str, record: Record) -> None:
+        self._hot.pop(key, None)
+        self._admit(key, record)
+        # New keys reach disk immediately so len() and iteration stay exact
+        self._write([(key, record)])
+
+    def __delitem__(self, key: str) -> None:
+        in_hot = self._hot.pop(key, None) is not None
+        self._dirty.discard(key)
+        cursor = self._conn.execute("DELETE FROM users WHERE id = ?", (key,))
+        if not in_hot and not cursor.rowcount:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._hot:
+            return True
+        return self._conn.execute("SELECT 1 FROM users WHERE id = ?", (key,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _ in self.iter_records():
+            yield key
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    # -- bulk helpers -------------------------------------------------------
+
+    def iter_records(self) -> Iterator[Tuple[str, Record]]:
+        """Stream every record; cold ones are decoded from disk and not cached.
+
+        Records for cold users are detached copies: use update_all to modify.
+        """
+        # Keyset pages are fetched whole, so callers may write between yields
+        last = ""
+        while True:
+            rows = self._conn.execute(
+                "SELECT id, record FROM users WHERE id > ? ORDER BY id LIMIT ?", (last, SCAN_PAGE)
+            ).fetchall()
+            if not rows:
+                return
+            for key, raw in rows:
+                hot = self._hot.get(key)
+                yield key, hot if hot is not None else json.loads(raw)
+            last = rows[-1][0]
+
+    def update_all(self, fn: Callable[[str, Record], bool]) -> int:
+        """Apply fn to every record; changed cold records are written straight back."""
+        changed = 0
+        pending: List[Tuple[str, Record]] = []
+        for key, record in self.iter_records():
+            if not fn(key, record):
+                continue
+            changed += 1
+            if key in self._hot:
+                self._dirty.add(key)
+            else:
+                pending.append((key, record))
+            if len(pending) >= SCAN_PAGE:
+                self._write(pending)
+                pending = []
+        if pending:
+            self._write(pending)
+        return changed
+
+    def find_username(self, username: str) -> Optional[str]:
+        self._write_dirty()
+        row = self._conn.execute(
+            "SELECT id FROM users WHERE username = ? LIMIT 1", (username.lower(),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def top_by_balance(self, limit: int) -> List[Tuple[str, Record]]:
+        self._write_dirty()
+        rows = self._conn.execute(
+            "SELECT id, record FROM users ORDER BY balance DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [(key, self._hot.get(key) or json.loads(raw)) for key, raw in rows]
+
+    def import_records(self, records: Dict[str, Record]) -> None:
+        """Bulk-load records straight to disk (used for migration)."""
+        self._write(list(records.items()))
+        self._conn.commit()
+
+    def flush(self) -> None:
+        """Write back modified hot records and commit."""
+        self._write_dirty()
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"resident": len(self._hot), "total": len(self), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
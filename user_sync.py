@@ -0,0 +1,46 @@
+"""Fingerprint cache for per-message user syncing.
+
+auto_sync_user sees every group message. Users whose (username, first_name)
+matched the store last time are skipped without touching storage; name
+changes are applied in memory and persisted with the next write.
+"""
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+MAX_FINGERPRINTS = 50000
+
+
+class SyncCache:
+    def __init__(self, max_size: int = MAX_FINGERPRINTS):
+        self.max_size = max_size
+        # Keyed by (bot_id, user_id), so each bot records the users it sees
+        self._fingerprints: "OrderedDict[Hashable, Tuple[str, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.name_changes = 0
+
+    def unchanged(self, user_id: Hashable, username: str, first_name: Optional[str]) -> bool:
+        """True (and counted as a hit) if the user was last seen with these names."""
+        fingerprint = self._fingerprints.get(user_id)
+        if fingerprint is not None and fingerprint == (username, first_name):
+            self._fingerprints.move_to_end(user_id)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def remember(self, user_id: Hashable, username: str, first_name: Optional[str]) -> None:
+        self._fingerprints[user_id] = (username, first_name)
+        self._fingerprints.move_to_end(user_id)
+        if len(self._fingerprints) > self.max_size:
+            self._fingerprints.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+
+cache = SyncCache()